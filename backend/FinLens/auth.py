@@ -1,15 +1,40 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+)
 from schemas import TokenData
+from cache import TTLCache
 
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 refresh_tokens_store: Dict[str, str] = {}
 
+# UserResponse snapshots for authenticated requests, keyed by the token's uid
+# claim. Tokens issued before that claim existed carry no uid: they bypass the
+# cache and look the user up by email on every request. No route changes a
+# user yet; one that does must delete the user's entry here.
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a small thread pool gives real parallelism while
+# keeping hashing off the event loop and out of Starlette's shared threadpool
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 def verify_password(plain_password, hashed_password):
@@ -20,6 +45,39 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def verify_and_rehash(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if the stored hash uses outdated settings (e.g. a
+    lower bcrypt cost), return a fresh hash to store in its place.
+    """
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
+async def verify_and_rehash_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, verify_and_rehash, plain_password, hashed_password
+    )
+
+
+def access_token_claims(user) -> dict:
+    """Claims carried by access tokens: the email as subject plus the user id."""
+    return {"sub": user.email, "uid": user.id}
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (
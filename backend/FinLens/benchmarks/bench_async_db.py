@@ -0,0 +1,208 @@
+"""
+Load test: requests/sec of the dashboard, budget and income/expense routes
+with sync sessions in the threadpool against the async engine (ASYNC_DB).
+
+Runs the routers in-process against one SQLite file (aiosqlite for the
+async engine) with --clients concurrent clients, each sending a mix of
+GET /expense/, /income/, /budget/alerts and /dashboard (dashboard cache
+cleared, so it queries) until --requests are done. Every statement sleeps
+for --latency-ms in the thread that executes it, to stand in for the round
+trip to a MySQL server; with 0 it measures pure overhead. The engines are
+instrumented as the app's are (engine_metrics.py), and the median SELECT
+time and 95th percentile pool wait are reported next to request latency.
+On the async engine a statement's time includes waiting for the busy event
+loop to resume the request once the driver has the result. Both engines get
+a pool larger than --clients, so only the threadpool (Starlette's default
+40 threads) limits the sync side.
+
+    python benchmarks/bench_async_db.py --clients 200 --requests 4000 --latency-ms 0,10,50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bench_db import make_sqlite_session
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import dependencies
+import rollup
+from auth import access_token_claims, create_access_token
+from engine_metrics import TimedAsyncQueuePool, TimedQueuePool, instrument
+from metrics import db_metrics
+from models import Budget, Expense, Income, User
+from reports import dashboard_cache
+from routers import budget_routes, dashboard_routes, expense_routes, income_routes
+
+CATEGORIES = ["Food", "Groceries", "Health", "Shopping", "Utilities", "Transportation"]
+PATHS = ["/expense/?limit=20", "/income/?limit=20", "/budget/alerts", "/dashboard"]
+USERS = 50
+
+
+def seed(Session, rows_per_user=60):
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    db = Session()
+    for user_id in range(1, USERS + 1):
+        db.add(User(id=user_id, full_name=f"User {user_id}", email=f"u{user_id}@example.com"))
+        for category in CATEGORIES:
+            db.add(Budget(user_id=user_id, category=category, amount=100))
+        for _ in range(rows_per_user):
+            when = now - timedelta(days=rng.randint(0, 90))
+            db.add(
+                Expense(
+                    user_id=user_id,
+                    category=rng.choice(CATEGORIES),
+                    amount=Decimal(rng.randint(100, 5000)) / 100,
+                    date=when,
+                )
+            )
+            db.add(Income(user_id=user_id, source="Salary", amount=500, date=when))
+    db.commit()
+    rollup.rebuild(db)
+    tokens = [
+        create_access_token(access_token_claims(user)) for user in db.query(User)
+    ]
+    db.close()
+    return tokens
+
+
+def add_latency(sync_engine, seconds, unwrap=lambda conn: conn):
+    """Sleep before every statement in the thread that runs it (sqlite3 trace callback)."""
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if seconds:
+            unwrap(dbapi_connection).set_trace_callback(lambda sql: time.sleep(seconds))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def load(app, tokens, clients, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def get(rng):
+            dashboard_cache.clear()
+            headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+            response = await client.get(rng.choice(PATHS), headers=headers)
+            assert response.status_code == 200, response.text
+
+        # Untimed round at full concurrency: opens the pool's connections and
+        # fills the user cache, which a long-running server has already done
+        rng = random.Random(-1)
+        await asyncio.gather(*(get(rng) for _ in range(clients)))
+        db_metrics.reset()
+
+        remaining = iter(range(requests))
+        latencies = []
+
+        async def worker(rng):
+            for _ in remaining:
+                t0 = time.perf_counter()
+                await get(rng)
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(random.Random(i)) for i in range(clients)))
+        return time.perf_counter() - t0, latencies
+
+
+async def run(app, mode, path, tokens, latency, args):
+    """One load run with the routes' sessions coming from `mode`'s engine."""
+    # A client's next request can start before the previous one's session is
+    # closed (dependency teardown runs after the response), hence the overflow
+    pool = {"pool_size": args.clients, "max_overflow": args.clients}
+    if mode == "threadpool":
+        engine = create_engine(
+            f"sqlite:///{path}",
+            connect_args={"check_same_thread": False},
+            poolclass=TimedQueuePool,
+            **pool,
+        )
+        instrument(engine, "sync")
+        add_latency(engine, latency)
+        dependencies.SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, bind=engine
+        )
+        dependencies.AsyncSessionLocal = None
+        try:
+            return await load(app, tokens, args.clients, args.requests)
+        finally:
+            engine.dispose()
+
+    # aiosqlite runs each connection's statements in a thread of its own
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=TimedAsyncQueuePool,
+        **pool,
+    )
+    instrument(engine.sync_engine, "async")
+    add_latency(
+        engine.sync_engine, latency, unwrap=lambda conn: conn.driver_connection._conn
+    )
+    dependencies.AsyncSessionLocal = async_sessionmaker(
+        engine, autoflush=False, expire_on_commit=False
+    )
+    try:
+        return await load(app, tokens, args.clients, args.requests)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--latency-ms", default="0,10,50", help="comma-separated")
+    args = parser.parse_args()
+    # Simulated latency makes every statement "slow"
+    logging.getLogger("engine_metrics").setLevel(logging.ERROR)
+
+    app = FastAPI()
+    for module in (dashboard_routes, budget_routes, expense_routes, income_routes):
+        app.include_router(module.router)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "load.db")
+        engine, Session = make_sqlite_session(path)
+        tokens = seed(Session)
+        engine.dispose()
+
+        print(f"{args.clients} clients, {args.requests} requests per run")
+        print(
+            f"{'latency':>7} {'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'select p50':>10} {'pool wait p95':>13}"
+        )
+        for latency_ms in (float(value) for value in args.latency_ms.split(",")):
+            for mode in ("threadpool", "async"):
+                elapsed, latencies = asyncio.run(
+                    run(app, mode, path, tokens, latency_ms / 1000, args)
+                )
+                label = "sync" if mode == "threadpool" else "async"
+                timings = db_metrics.snapshot()
+                print(
+                    f"{latency_ms:>7g} {mode:>10} {args.requests / elapsed:>8.0f} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} "
+                    f"{percentile(latencies, 0.99) * 1000:>8.1f} "
+                    f"{timings[f'{label}.select']['p50_ms']:>10.1f} "
+                    f"{timings[f'{label}.pool_wait']['p95_ms']:>13.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
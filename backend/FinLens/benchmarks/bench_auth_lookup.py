@@ -0,0 +1,70 @@
+"""
+Authenticated-request overhead: per-request user lookup vs the token uid
+claim plus in-process user cache.
+
+Runs GET /budget/all in-process against SQLite and reports statements per
+request and latency. "lookup" clears the user cache before every request,
+which reproduces the old behaviour of one user SELECT per request.
+
+    python benchmarks/bench_auth_lookup.py --requests 2000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from bench_db import QueryCounter, make_sqlite_session
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import dependencies
+from auth import access_token_claims, create_access_token, user_cache
+from models import Budget, User
+from routers import budget_routes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine, Session = make_sqlite_session(os.path.join(tmpdir, "auth.db"))
+        db = Session()
+        user = User(id=1, full_name="Bench User", email="bench@example.com")
+        db.add(user)
+        db.add(Budget(user_id=1, category="Food", amount=100))
+        db.commit()
+        token = create_access_token(access_token_claims(user))
+        db.close()
+
+        # The routes' sessions (get_async_db without ASYNC_DB) and user lookups
+        dependencies.SessionLocal = Session
+        app = FastAPI()
+        app.include_router(budget_routes.router)
+
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for mode in ("lookup", "cached"):
+            latencies = []
+            with QueryCounter(engine) as counter:
+                for _ in range(args.requests):
+                    if mode == "lookup":
+                        user_cache.clear()
+                    t0 = time.perf_counter()
+                    response = client.get("/budget/all", headers=headers)
+                    latencies.append(time.perf_counter() - t0)
+                    assert response.status_code == 200, response.text
+            latencies.sort()
+            print(
+                f"{mode:>7}: {counter.count / args.requests:.2f} queries/request  "
+                f"p50={statistics.median(latencies) * 1000:.2f}ms  "
+                f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Budget alerts: per-budget SUM queries (the old N+1 loop) vs the single
+grouped aggregate now used by GET /budget/alerts.
+
+Seeds users with many budgets and a month of expenses in SQLite, then
+reports statements per call and latency for both.
+
+    python benchmarks/bench_budget_alerts.py --budgets 30 --expenses 2000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from bench_db import QueryCounter, make_sqlite_session
+from sqlalchemy import func
+
+from models import Budget, Expense, User
+from reports import budget_alerts
+from utils import get_month_range
+
+
+def legacy_alerts(db, user_id, start, end):
+    alerts = []
+    for budget in db.query(Budget).filter(Budget.user_id == user_id).all():
+        spent = (
+            db.query(func.sum(Expense.amount))
+            .filter(
+                Expense.user_id == user_id,
+                Expense.category == budget.category,
+                Expense.date >= start,
+                Expense.date < end,
+            )
+            .scalar()
+        ) or Decimal("0")
+        if spent >= budget.amount * Decimal("0.8"):
+            alerts.append(budget.category)
+    return alerts
+
+
+def seed(Session, users, budgets, expenses):
+    rng = random.Random(0)
+    start, _ = get_month_range()
+    categories = [f"Category {i}" for i in range(budgets)]
+    db = Session()
+    for user_id in range(1, users + 1):
+        db.add(User(id=user_id, full_name=f"User {user_id}", email=f"u{user_id}@example.com"))
+        for category in categories:
+            db.add(Budget(user_id=user_id, category=category, amount=rng.randint(50, 500)))
+        for _ in range(expenses):
+            db.add(
+                Expense(
+                    user_id=user_id,
+                    category=rng.choice(categories),
+                    amount=Decimal(rng.randint(1, 3000)) / 100,
+                    date=start + timedelta(hours=rng.randint(0, 24 * 27)),
+                )
+            )
+    db.commit()
+    db.close()
+
+
+def measure(engine, fn, repeats):
+    with QueryCounter(engine) as counter:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        elapsed = time.perf_counter() - t0
+    return counter.count / repeats, elapsed / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--budgets", type=int, default=30)
+    parser.add_argument("--expenses", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    engine, Session = make_sqlite_session()
+    seed(Session, args.users, args.budgets, args.expenses)
+    start, end = get_month_range()
+    db = Session()
+    user = SimpleNamespace(id=1)
+
+    queries, ms = measure(engine, lambda: legacy_alerts(db, 1, start, end), args.repeats)
+    print(f"per-budget loop : {queries:.0f} queries/call  {ms:.2f} ms/call")
+    queries, ms = measure(
+        engine, lambda: budget_alerts(db, user.id), args.repeats
+    )
+    print(f"grouped query   : {queries:.0f} queries/call  {ms:.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
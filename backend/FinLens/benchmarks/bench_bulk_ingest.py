@@ -0,0 +1,97 @@
+"""
+Rows/sec for bulk expense ingestion against one create_expense call per row.
+
+Both paths validate through ExpenseCreate and update the monthly rollup; the
+rollup is checked against the raw rows afterwards. Uses a file-backed SQLite
+database so commits cost something, as they do on a real server.
+
+    python benchmarks/bench_bulk_ingest.py --rows 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_db import make_sqlite_session
+from sqlalchemy import insert
+
+import crud
+import ingest
+import rollup
+from models import User
+from schemas import ExpenseCreate
+
+CATEGORIES = ["Food", "Groceries", "Health", "Shopping", "Utilities", "Transportation"]
+
+
+def make_rows(n, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = [
+        {
+            "category": rng.choice(CATEGORIES),
+            "amount": rng.randint(100, 10000) / 100,
+            "date": (start + timedelta(minutes=rng.randint(0, 500_000))).isoformat(),
+            "icon": None,
+        }
+        for _ in range(n)
+    ]
+    # A sprinkling of bad rows to exercise per-row error reporting.
+    for i in range(0, n, 1000):
+        rows[i] = {**rows[i], "amount": "not a number"}
+    return rows
+
+
+def run(label, fn, Session, rows):
+    db = Session()
+    db.execute(insert(User), [{"id": 1, "full_name": "Bench", "email": "b@example.com"}])
+    db.commit()
+    t0 = time.perf_counter()
+    inserted, failed = fn(db, rows)
+    elapsed = time.perf_counter() - t0
+    mismatches = rollup.check(db, 1)
+    db.close()
+    print(
+        f"{label:<10} {inserted:>7} rows {failed:>4} failed {elapsed:>8.2f}s "
+        f"{inserted / elapsed:>10.0f} rows/s rollup {'OK' if not mismatches else 'MISMATCH'}"
+    )
+
+
+def per_row(db, rows):
+    inserted = failed = 0
+    for row in rows:
+        try:
+            expense = ExpenseCreate(**row)
+        except ValueError:
+            failed += 1
+            continue
+        crud.create_expense(db, expense, user_id=1)
+        inserted += 1
+    return inserted, failed
+
+
+def bulk(db, rows):
+    result = ingest.ingest(db, "expense", rows, user_id=1)
+    return result["inserted"], result["failed"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--per-row-rows", type=int, default=2000, help="rows for the slow path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, fn, n in (
+            ("per-row", per_row, args.per_row_rows),
+            ("bulk", bulk, args.rows),
+        ):
+            engine, Session = make_sqlite_session(os.path.join(tmpdir, f"{label}.db"))
+            run(label, fn, Session, make_rows(n))
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
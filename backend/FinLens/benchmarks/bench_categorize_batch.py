@@ -0,0 +1,59 @@
+"""
+Per-line vs batched categorization.
+
+Builds synthetic receipts of 10, 100 and 1000 priced lines from the training
+vocabulary and times `categorize_text_local` in a loop against a single
+`categorize_batch` call.
+
+    python benchmarks/bench_categorize_batch.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+import model_registry  # noqa: E402
+from train_model import base_dataset  # noqa: E402
+
+SIZES = (10, 100, 1000)
+REPEATS = 5
+
+
+def make_receipt(n_lines: int, rng: random.Random):
+    vocabulary = [item for items in base_dataset.values() for item in items]
+    return [
+        f"{rng.choice(vocabulary)} {rng.randint(1, 99)}.{rng.randint(0, 99):02d}"
+        for _ in range(n_lines)
+    ]
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = random.Random(0)
+    model_registry.load()
+
+    print(f"{'lines':>6} {'per-line ms':>12} {'batched ms':>11} {'speedup':>8}")
+    for n_lines in SIZES:
+        lines = make_receipt(n_lines, rng)
+        per_line = best_of(lambda: [utils.categorize_text_local(l) for l in lines])
+        batched = best_of(lambda: utils.categorize_batch(lines))
+        assert [utils.categorize_text_local(l) for l in lines] == utils.categorize_batch(lines)
+        print(
+            f"{n_lines:>6} {per_line * 1000:>12.2f} {batched * 1000:>11.2f} "
+            f"{per_line / batched:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
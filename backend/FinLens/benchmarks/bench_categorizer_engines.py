@@ -0,0 +1,101 @@
+"""
+Categorizer engines side by side: the CountVectorizer + NB pipeline and
+the hashing engine (hashing_categorizer.py), trained with the same seed and
+split.
+
+Reports:
+- accuracy on the held-out split and on receipt-style variants of the
+  vocabulary (see report_fallback.py). The variants are of items both
+  engines trained on, so that column compares the engines rather than
+  estimating accuracy on new receipts;
+- predict_proba latency for 1, 20 and 1000 items;
+- the size of the saved artifact, the memory the loaded model takes, and
+  the peak allocation of one 20-item call.
+
+    python benchmarks/bench_categorizer_engines.py
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+import joblib
+
+import model_registry
+import train_model
+from line_parser import normalize_item_text
+from report_fallback import synthetic_labels
+
+BATCH_SIZES = (1, 20, 1000)
+
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def loaded_size(model):
+    """Bytes allocated loading the saved model, and its size on disk."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        joblib.dump(model, path)
+        tracemalloc.start()
+        loaded = joblib.load(path)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return loaded, size, os.path.getsize(path)
+
+
+def peak_allocation(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    variants = synthetic_labels(args.seed)
+    variant_texts = [normalize_item_text(text) for text, _ in variants]
+    variant_truth = [category for _, category in variants]
+    vocabulary = [text for text in variant_texts if text]
+    rng = random.Random(args.seed)
+
+    print(f"{'engine':<9} {'held-out':>8} {'variants':>8} ", end="")
+    print(" ".join(f"{f'{n} items us':>13}" for n in BATCH_SIZES), end="")
+    print(f" {'artifact KB':>11} {'loaded KB':>9} {'call peak KB':>12}")
+    for engine in model_registry.ENGINES:
+        model, held_out = train_model.train(seed=args.seed, engine=engine)
+        model, memory, disk = loaded_size(model)
+        predictions = model.predict(variant_texts)
+        variant_accuracy = sum(p == t for p, t in zip(predictions, variant_truth)) / len(
+            variants
+        )
+        latencies = []
+        for n in BATCH_SIZES:
+            batch = [rng.choice(vocabulary) for _ in range(n)]
+            model.predict_proba(batch)  # warm up
+            latencies.append(best_of(lambda: model.predict_proba(batch), args.repeat))
+        receipt = [rng.choice(vocabulary) for _ in range(20)]
+        peak = peak_allocation(lambda: model.predict_proba(receipt))
+
+        print(f"{engine:<9} {held_out:>8.1%} {variant_accuracy:>8.1%} ", end="")
+        print(" ".join(f"{seconds * 1e6:>13.0f}" for seconds in latencies), end="")
+        print(f" {disk / 1024:>11.0f} {memory / 1024:>9.0f} {peak / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Engine instrumentation (engine_metrics.py): what the statement and pool
+hooks cost, and whether they tell pool starvation apart from slow queries.
+
+1. Times --statements small SELECTs on a SQLite file with and without the
+   hooks and reports the overhead per statement.
+2. Runs --threads threads against a pool of --pool-size connections, each
+   holding its connection for one --query-ms statement, and prints what
+   db_metrics recorded: statement time stays at --query-ms while the pool
+   wait grows with the queue.
+
+    python benchmarks/bench_engine_metrics.py --threads 16 --pool-size 4
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+from sqlalchemy import create_engine, event, text
+
+from engine_metrics import TimedQueuePool, instrument
+from metrics import db_metrics
+
+
+def make_engine(path, instrumented, pool_size=5, query_seconds=0.0):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    if query_seconds:
+
+        @event.listens_for(engine, "connect")
+        def slow_statements(dbapi_connection, connection_record):
+            dbapi_connection.set_trace_callback(lambda sql: time.sleep(query_seconds))
+
+    if instrumented:
+        instrument(engine, "sync")
+    return engine
+
+
+def statement_overhead(path, statements):
+    per_statement = {}
+    for instrumented in (False, True):
+        engine = make_engine(path, instrumented)
+        with engine.connect() as conn:
+            stmt = text("SELECT 1")
+            conn.execute(stmt)
+            t0 = time.perf_counter()
+            for _ in range(statements):
+                conn.execute(stmt).scalar()
+            per_statement[instrumented] = (time.perf_counter() - t0) / statements
+        engine.dispose()
+    print(
+        f"SELECT 1 x {statements}: {per_statement[False] * 1e6:.1f} us plain, "
+        f"{per_statement[True] * 1e6:.1f} us instrumented "
+        f"(+{(per_statement[True] - per_statement[False]) * 1e6:.1f} us/statement)"
+    )
+
+
+def starvation(path, threads, pool_size, query_ms):
+    engine = make_engine(path, True, pool_size=pool_size, query_seconds=query_ms / 1000)
+    db_metrics.reset()
+
+    def request():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1")).scalar()
+
+    workers = [threading.Thread(target=request) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    engine.dispose()
+
+    timings = db_metrics.snapshot()
+    print(f"{threads} threads, pool of {pool_size}, {query_ms:g} ms statements:")
+    for stage in ("sync.select", "sync.pool_wait"):
+        t = timings[stage]
+        print(
+            f"  {stage:<15} n={t['count']:<4} p50 {t['p50_ms']:7.1f} ms  "
+            f"p95 {t['p95_ms']:7.1f} ms  max {t['max_ms']:7.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--statements", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--query-ms", type=float, default=50)
+    args = parser.parse_args()
+    logging.getLogger("engine_metrics").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "metrics.db")
+        statement_overhead(path, args.statements)
+        starvation(path, args.threads, args.pool_size, args.query_ms)
+
+
+if __name__ == "__main__":
+    main()
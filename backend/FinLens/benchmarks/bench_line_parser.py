@@ -0,0 +1,86 @@
+"""
+Receipt line parsing throughput: the previous per-step regex code
+(legacy_line_parse.py) against line_parser.parse_line, over synthetic receipt
+lines. Also counts lines where the two disagree, which should be zero.
+
+    python benchmarks/bench_line_parser.py [--lines 100000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+import legacy_line_parse
+from line_parser import parse_line
+from check_line_parser import as_record, _jsonable
+
+ITEMS = [
+    "Whole Milk", "Sourdough Bread", "Bananas", "Chicken Breast", "Cheddar Cheese",
+    "Orange Juice", "Shampoo", "Toothpaste", "Paracetamol", "Coffee Beans",
+    "Pasta", "Tomato Sauce", "Dish Soap", "Batteries AA", "Greek Yogurt",
+    "Olive Oil", "Rice", "Paper Towels", "Uber Trip", "Movie Ticket",
+]
+UNITS = ["", " 500ml", " 1L", " 2 kg", " 3 pcs", " 12 pack", " 1 box"]
+OTHER = [
+    "CORNER MARKET", "123 Main Street", "Tel: 555-0134", "THANK YOU",
+    "Payment Method: VISA", "Cashier: Anna", "10/18/2026 15:27",
+    "******************", "Receipt #004512",
+]
+
+
+def synthetic_lines(count, rng):
+    lines = []
+    for _ in range(count):
+        roll = rng.random()
+        price = f"{rng.randint(1, 9999) / 100:.2f}"
+        if roll < 0.65:
+            prefix = rng.choice(["", "", "", "2 x ", "=", "* "])
+            currency = rng.choice(["$", "", "", "₹"])
+            lines.append(f"{prefix}{rng.choice(ITEMS)}{rng.choice(UNITS)} {currency}{price}")
+        elif roll < 0.75:
+            lines.append(rng.choice(["TOTAL", "Subtotal", "Sales Tax", "VAT 13%"]) + f" ${price}")
+        elif roll < 0.95:
+            lines.append(rng.choice(OTHER))
+        else:
+            lines.append("   ")
+    return lines
+
+
+def time_parser(fn, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = synthetic_lines(args.lines, random.Random(0))
+    mismatches = sum(
+        as_record(parse_line(line))
+        != list(map(_jsonable, legacy_line_parse.parse_line(line)))
+        for line in lines
+    )
+
+    legacy = time_parser(legacy_line_parse.parse_line, lines, args.repeat)
+    new = time_parser(parse_line, lines, args.repeat)
+    print(f"{len(lines)} lines, best of {args.repeat}")
+    print(f"{'parser':<12} {'total s':>8} {'us/line':>8} {'lines/s':>10}")
+    for label, seconds in (("legacy", legacy), ("line_parser", new)):
+        print(
+            f"{label:<12} {seconds:>8.3f} {seconds / len(lines) * 1e6:>8.2f} "
+            f"{len(lines) / seconds:>10.0f}"
+        )
+    print(f"speedup {legacy / new:.2f}x, {mismatches} lines differ")
+
+
+if __name__ == "__main__":
+    main()
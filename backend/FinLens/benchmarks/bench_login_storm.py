@@ -0,0 +1,156 @@
+"""
+Login storm: latency of an unrelated endpoint while many logins run.
+
+Fires --logins concurrent POST /auth/login requests against an in-process
+app (SQLite, one event loop) while probing two trivial endpoints, and reports
+their p50/p99: GET /ping is async, GET /ping-sync is a plain def and so runs
+in Starlette's threadpool like every DB-backed route. "threadpool" is the
+old login, a sync handler verifying bcrypt in that threadpool; "executor" is
+the current one, using the dedicated password-hash pool.
+
+    python benchmarks/bench_login_storm.py --logins 200 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from bench_db import make_sqlite_session
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+
+import auth
+from config import BCRYPT_ROUNDS
+from crud import get_user_by_email
+import dependencies
+from models import User
+from routers import auth_routes
+
+PROBES = ("/ping", "/ping-sync")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def storm(app, logins, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    "/auth/login",
+                    data={"username": "bench@example.com", "password": "secret"},
+                )
+                assert response.status_code == 200, response.text
+
+        async def probe(path, latencies):
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.005)
+
+        latencies = {path: [] for path in PROBES}
+        probes = [asyncio.create_task(probe(path, latencies[path])) for path in PROBES]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await asyncio.gather(*probes)
+        return elapsed, latencies
+
+
+def make_app(get_db, login_router):
+    app = FastAPI()
+    app.include_router(login_router, prefix="/auth")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/ping-sync")
+    def ping_sync():
+        return {"ok": True}
+
+    app.dependency_overrides[dependencies.get_db] = get_db
+    return app
+
+
+def threadpool_router():
+    """The login handler as it was before the password-hash pool."""
+    router = APIRouter()
+
+    @router.post("/login")
+    def login(
+        form_data: OAuth2PasswordRequestForm = Depends(),
+        db: Session = Depends(dependencies.get_db),
+    ):
+        user = get_user_by_email(db, form_data.username)
+        if not user or not auth.verify_password(form_data.password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        token = auth.create_access_token(
+            data={"sub": user.email}, expires_delta=timedelta(minutes=30)
+        )
+        return {"access_token": token, "token_type": "bearer"}
+
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=BCRYPT_ROUNDS)
+    args = parser.parse_args()
+
+    auth.pwd_context.update(bcrypt__rounds=args.rounds)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine, Session = make_sqlite_session(os.path.join(tmpdir, "login.db"))
+        db = Session()
+        db.add(
+            User(
+                full_name="Bench User",
+                email="bench@example.com",
+                password_hash=auth.get_password_hash("secret"),
+            )
+        )
+        db.commit()
+        db.close()
+
+        def get_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        modes = (
+            ("threadpool", threadpool_router()),
+            ("executor", auth_routes.router),
+        )
+        for mode, router in modes:
+            app = make_app(get_db, router)
+            elapsed, latencies = asyncio.run(storm(app, args.logins, args.concurrency))
+            print(f"{mode:>10}: {args.logins / elapsed:6.1f} logins/s")
+            for path in PROBES:
+                values = latencies[path]
+                print(
+                    f"{path:>16} p50={statistics.median(values) * 1000:7.2f}ms "
+                    f"p99={percentile(values, 0.99) * 1000:7.2f}ms "
+                    f"({len(values)} probes)"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Merchant short-circuit: how many receipts the merchant index categorizes on
+its own, how often it is right, and what it costs next to the model.
+
+Synthetic receipts come from seeded merchants (exact, with store numbers,
+with an outlet or location suffix, or with one OCR-style character misread)
+and from merchants that aren't in the index, some of them starting with a
+seeded name ("UBER EATS", "Shell Seafood Grill"). For each receipt the merchant line goes through
+extract_merchant_name and merchant_index.categorize; receipts it doesn't
+categorize are timed through the model as process_receipt_text would.
+
+    python benchmarks/bench_merchant_index.py [--receipts 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+import model_registry
+import utils
+from line_parser import normalize_item_text
+from merchants import MerchantIndex, SEED_MERCHANTS
+from train_model import base_dataset
+
+UNKNOWN = [
+    "CORNER MARKET", "Joe's Hardware", "Main St Deli", "Sunrise Laundromat",
+    "City Parking Garage", "Green Leaf Florist", "Bob's Burgers", "Mobile Phone Shop",
+    "Shellys Bakery", "Best Western Hotel", "Domino Hardware",
+    # Start with a seeded name but are other businesses
+    "UBER EATS", "Shell Seafood Grill", "Boots Barn", "Arco Hardware",
+    "Subway Sandwich Art Gallery",
+]
+OUTLET_SUFFIXES = ["MAIN ST", "EXPRESS", "AIRPORT", "DOWNTOWN"]
+MISREADS = {"c": "e", "l": "1", "o": "0", "m": "rn", "s": "5", "a": "o"}
+
+
+def misread(name, rng):
+    positions = [i for i, ch in enumerate(name) if ch.lower() in MISREADS]
+    if not positions:
+        return name
+    i = rng.choice(positions)
+    return name[:i] + MISREADS[name[i].lower()] + name[i + 1 :]
+
+
+def merchant_line(rng):
+    """(printed merchant line, its true category or None if unknown)."""
+    if rng.random() < 0.3:
+        return rng.choice(UNKNOWN), None
+    name, category = rng.choice(list(SEED_MERCHANTS.items()))
+    style = rng.random()
+    if style < 0.4:
+        line = name.upper()
+    elif style < 0.6:
+        line = f"{name.title()} #{rng.randint(100, 99999)}"
+    elif style < 0.75:
+        line = f"{name.upper()} {rng.choice(OUTLET_SUFFIXES)}"
+    else:
+        line = misread(name.upper(), rng)
+    return line, category
+
+
+def make_receipts(count, rng):
+    vocabulary = [item for items in base_dataset.values() for item in items]
+    receipts = []
+    for _ in range(count):
+        line, category = merchant_line(rng)
+        items = [
+            f"{rng.choice(vocabulary)} {rng.randint(1, 99)}.{rng.randint(0, 99):02d}"
+            for _ in range(rng.randint(3, 15))
+        ]
+        receipts.append((line, category, items))
+    return receipts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--receipts", type=int, default=2000)
+    args = parser.parse_args()
+
+    model_registry.load()
+    index = MerchantIndex()
+    receipts = make_receipts(args.receipts, random.Random(0))
+
+    lookup_us, model_ms = [], []
+    hits = correct = false_hits = items_skipped = items_total = 0
+    for line, category, items in receipts:
+        items_total += len(items)
+        t0 = time.perf_counter()
+        match = index.categorize(utils.extract_merchant_name(line))
+        lookup_us.append((time.perf_counter() - t0) * 1e6)
+        if match is not None:
+            hits += 1
+            items_skipped += len(items)
+            if category is None:
+                false_hits += 1
+            elif match.category == category:
+                correct += 1
+            continue
+        t0 = time.perf_counter()
+        utils.categorize_normalized([normalize_item_text(item) for item in items])
+        model_ms.append((time.perf_counter() - t0) * 1000)
+
+    known = sum(category is not None for _, category, _ in receipts)
+    lookup_us.sort()
+    print(f"{len(receipts)} receipts ({known} from indexed merchants), {items_total} items")
+    print(f"short-circuited receipts  {hits / len(receipts):.1%} ({hits / known:.1%} of indexed)")
+    print(f"  correct category        {correct}/{hits - false_hits}")
+    print(f"  unindexed merchants hit {false_hits}")
+    print(f"items skipping the model  {items_skipped / items_total:.1%}")
+    print(
+        f"lookup us                 median {statistics.median(lookup_us):.1f}, "
+        f"p99 {lookup_us[int(len(lookup_us) * 0.99)]:.1f}"
+    )
+    if model_ms:
+        print(f"model ms per receipt      median {statistics.median(model_ms):.2f}")
+
+
+if __name__ == "__main__":
+    main()
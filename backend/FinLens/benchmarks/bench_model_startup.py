@@ -0,0 +1,69 @@
+"""
+Startup benchmark for the receipt categorizer.
+
+Boots N fresh interpreters at the same time (like uvicorn/gunicorn workers),
+each importing `utils` and loading the model, and reports load time and peak RSS
+per worker.
+
+    python benchmarks/bench_model_startup.py --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_SNIPPET = """
+import json, resource, time
+t0 = time.perf_counter()
+import utils, model_registry
+t1 = time.perf_counter()
+loaded = model_registry.load()
+t2 = time.perf_counter()
+loaded["model"].predict(["milk 1l"])
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "load_s": t2 - t1,
+    "first_predict_s": t3 - t2,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "version": loaded["manifest"]["version"],
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER_SNIPPET],
+            cwd=BACKEND_DIR,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(args.workers)
+    ]
+    results = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode != 0:
+            sys.exit(f"worker failed with exit code {proc.returncode}")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"model version: {results[0]['version']}  workers: {args.workers}")
+    for key in ("import_s", "load_s", "first_predict_s", "max_rss_mb"):
+        values = [r[key] for r in results]
+        print(
+            f"{key:>16}: mean={statistics.mean(values):.3f} "
+            f"min={min(values):.3f} max={max(values):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
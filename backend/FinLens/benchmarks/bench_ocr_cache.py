@@ -0,0 +1,76 @@
+"""
+Lookup cost of the OCR result cache for a phone-sized upload: hashing the
+bytes, then a memory hit, a disk hit (memory tier cold) and a miss. Also
+checks that the disk tier stays under its size cap.
+
+    python benchmarks/bench_ocr_cache.py --image-mb 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+from ocr_cache import OCRResultCache
+
+RESULT = {
+    "merchant": "CORNER MARKET",
+    "categorized": {"Groceries": 12.48, "Food": 3.5},
+    "line_items": [
+        {"description": "Milk 2L", "category": "Groceries", "amount": 4.99},
+        {"description": "Bread", "category": "Groceries", "amount": 7.49},
+        {"description": "Coffee", "category": "Food", "amount": 3.5},
+    ],
+    "uncategorized_lines": ["THANK YOU"],
+}
+
+
+def timed(fn, repeats=20):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image-mb", type=float, default=4)
+    args = parser.parse_args()
+    contents = os.urandom(int(args.image_mb * 1024 * 1024))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = OCRResultCache(maxsize=128, disk_dir=tmpdir, disk_max_bytes=64 * 1024)
+        key_ms, key = timed(lambda: cache.key(contents))
+        miss_ms, _ = timed(lambda: cache.get("0" * 64))
+        cache.set(key, RESULT)
+        memory_ms, hit = timed(lambda: cache.get(key))
+        assert hit == RESULT
+
+        def cold_get():
+            cache.memory.clear()
+            return cache.get(key)
+
+        disk_ms, hit = timed(cold_get)
+        assert hit == RESULT
+
+        print(f"hash {args.image_mb:.0f} MB upload: {key_ms:8.3f} ms")
+        print(f"miss:                 {miss_ms:8.3f} ms")
+        print(f"memory hit:           {memory_ms:8.3f} ms")
+        print(f"disk hit:             {disk_ms:8.3f} ms")
+
+        for i in range(1000):
+            cache.set(f"{i:064x}", RESULT)
+        on_disk = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(tmpdir)
+            for name in files
+        )
+        print(f"disk tier after 1000 writes: {on_disk} bytes (cap {cache.disk_max_bytes})")
+        assert on_disk <= cache.disk_max_bytes
+
+
+if __name__ == "__main__":
+    main()
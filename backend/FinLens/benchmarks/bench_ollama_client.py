@@ -0,0 +1,68 @@
+"""
+Fallback client against the fake Ollama server: fan-out latency, the
+concurrency cap, and cache hits for repeated items.
+
+    python benchmarks/bench_ollama_client.py --items 40 --delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import FakeOllamaServer  # noqa: E402
+from ollama_client import OllamaClient  # noqa: E402
+
+ITEMS = ["milk", "Milk 1L", "pizza slice", "cough syrup", "taxi", "widget", "gizmo"]
+
+
+async def run(args, server):
+    client = OllamaClient(
+        base_url=server.url,
+        timeout=args.delay * 10,
+        concurrency_per_receipt=args.concurrency,
+    )
+    rng = random.Random(0)
+    receipt = [f"{rng.choice(ITEMS)} #{rng.randint(1, args.unique)}" for _ in range(args.items)]
+
+    try:
+        t0 = time.perf_counter()
+        await client.categorize_many(receipt)
+        cold = time.perf_counter() - t0
+        cold_requests = server.request_count
+
+        t0 = time.perf_counter()
+        await client.categorize_many(receipt)
+        warm = time.perf_counter() - t0
+    finally:
+        await client.close()
+
+    print(f"items={args.items} unique_keys~{cold_requests} delay={args.delay}s")
+    print(f"cold receipt: {cold:.3f}s, {cold_requests} LLM requests, "
+          f"max {server.max_concurrent} concurrent (cap {args.concurrency})")
+    print(f"warm receipt: {warm * 1000:.2f}ms, "
+          f"{server.request_count - cold_requests} LLM requests")
+    print(f"serial equivalent: {cold_requests * args.delay:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--unique", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(("127.0.0.1", 0), delay=args.delay)
+    server.start_in_thread()
+    try:
+        asyncio.run(run(args, server))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-user overrides and the online categorizer.
+
+Saves a set of corrections for one user to a throwaway SQLite database, then
+times applying that user's overrides to scan results (cached override dict,
+as in the API) and one partial_fit update of the online categorizer against
+a full retrain of the pipeline. Also reports how many new items of the
+corrected (made-up) brands the online model gets right before and after
+learning the corrections.
+
+    python benchmarks/bench_overrides.py [--overrides 1000] [--corrections 200]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from bench_db import make_sqlite_session
+
+import train_model
+from line_parser import normalize_item_text
+from online_model import OnlineCategorizer
+from overrides import apply_overrides, get_overrides, save_corrections
+from utils import valid_categories
+
+USER_ID = 1
+NOUNS = ["pack", "classic", "original", "family size", "refill", "deluxe", "mini", "plus"]
+
+
+def make_result(descriptions, rng):
+    items = [
+        {"description": d, "category": "Other", "amount": rng.randint(100, 2000) / 100}
+        for d in descriptions
+    ]
+    return {
+        "merchant": "CORNER MARKET",
+        "categorized": {"Other": sum(item["amount"] for item in items)},
+        "line_items": items,
+        "uncategorized_lines": [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--overrides", type=int, default=1000)
+    parser.add_argument("--corrections", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    _, Session = make_sqlite_session()
+    db = Session()
+    # House brands the training data has never seen, each always corrected to
+    # the same category
+    categories = sorted(valid_categories - {"Other"})
+    brands = {
+        "".join(rng.choice("bcdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3)):
+        rng.choice(categories)
+        for _ in range(60)
+    }
+    picks = rng.choices(list(brands.items()), k=args.overrides)
+    corrections = [
+        (f"{brand} {rng.choice(NOUNS)} {i}", category)
+        for i, (brand, category) in enumerate(picks)
+    ]
+    save_corrections(db, USER_ID, corrections)
+
+    # Receipts of 20 items, a quarter of them corrected before
+    results = []
+    for _ in range(500):
+        descriptions = [
+            rng.choice(corrections)[0] if rng.random() < 0.25 else f"Unlisted {j}"
+            for j in range(20)
+        ]
+        results.append(make_result(descriptions, rng))
+    get_overrides(db, USER_ID)
+    timings = []
+    for result in results:
+        t0 = time.perf_counter()
+        apply_overrides(result, get_overrides(db, USER_ID))
+        timings.append((time.perf_counter() - t0) * 1e6)
+    print(f"{args.overrides} overrides, 20-item receipts")
+    print(
+        f"apply overrides us/receipt  median {statistics.median(timings):.1f}, "
+        f"per item {statistics.median(timings) / 20:.2f}"
+    )
+
+    # Unseen items of the corrected brands
+    online = OnlineCategorizer()
+    sample = [
+        (f"{brand} {rng.choice(NOUNS)} new", category)
+        for brand, category in rng.choices(list(brands.items()), k=args.corrections)
+    ]
+    texts = [normalize_item_text(text) for text, _ in sample]
+    labels = [category for _, category in sample]
+
+    def correct():
+        return sum(p == y for p, y in zip(online.predict(texts), labels))
+
+    before = correct()
+    t0 = time.perf_counter()
+    online.update_from_db(db)
+    partial = time.perf_counter() - t0
+    after = correct()
+
+    t0 = time.perf_counter()
+    train_model.train()
+    full = time.perf_counter() - t0
+    print(f"new items of corrected brands right  {before}/{len(sample)} -> {after}/{len(sample)}")
+    print(f"partial_fit of {args.overrides} corrections   {partial * 1000:.1f} ms")
+    print(f"full pipeline retrain                {full * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Keyset vs OFFSET pagination over one user's expense history.
+
+Seeds a SQLite database (through the migrations, so the composite indexes
+are in place) with --rows expenses for one user plus noise from others, then
+times single pages at increasing depth with both strategies.
+
+    python benchmarks/bench_pagination.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_db import QueryCounter  # noqa: F401 - sets up sys.path
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from migrate import upgrade_database
+from models import Expense, User
+
+PAGE_SIZE = 100
+CATEGORIES = ["Food", "Groceries", "Health", "Shopping", "Utilities", "Transportation"]
+
+
+def seed(engine, rows, other_users=4, chunk=50000):
+    """`rows` expenses for user 1 and as many again spread over other users."""
+    rng = random.Random(0)
+    start = datetime(2000, 1, 1)
+
+    def expense(user_id):
+        return {
+            "user_id": user_id,
+            "category": rng.choice(CATEGORIES),
+            "amount": rng.randint(100, 10000) / 100,
+            "date": start + timedelta(minutes=rng.randint(0, 13_000_000)),
+        }
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {"id": i, "full_name": f"User {i}", "email": f"u{i}@example.com"}
+                for i in range(1, other_users + 2)
+            ],
+        )
+        for offset in range(0, rows, chunk):
+            n = min(chunk, rows - offset)
+            batch = [expense(1) for _ in range(n)]
+            batch += [expense(rng.randint(2, other_users + 1)) for _ in range(n)]
+            conn.execute(insert(Expense), batch)
+
+
+def timed(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows for the measured user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'pages.db')}")
+        upgrade_database(bind=engine)
+        t0 = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"seeded {args.rows} rows for user 1 in {time.perf_counter() - t0:.1f}s")
+        Session = sessionmaker(bind=engine)
+        db = Session()
+
+        depths = [d for d in (1, 10, 100, 1000, 5000) if d * PAGE_SIZE < args.rows]
+        cursors = {}
+        cursor = None
+        for page in range(1, max(depths) + 1):
+            if page in depths:
+                cursors[page] = cursor
+            _, cursor = crud.get_expenses_page(db, 1, limit=PAGE_SIZE, cursor=cursor)
+
+        print(f"{'page':>6} {'keyset ms':>10} {'offset ms':>10}")
+        for page in depths:
+            keyset_ms, (rows, _) = timed(
+                lambda: crud.get_expenses_page(db, 1, limit=PAGE_SIZE, cursor=cursors[page])
+            )
+            offset_ms, offset_rows = timed(
+                lambda: crud.get_expenses(
+                    db, 1, skip=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE
+                )
+            )
+            assert [r.id for r in rows] == [r.id for r in offset_rows]
+            print(f"{page:>6} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
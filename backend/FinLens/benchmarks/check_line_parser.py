@@ -0,0 +1,116 @@
+"""
+Check line_parser against the golden corpus of receipt lines.
+
+golden/receipt_lines.json holds, for every line of golden/receipt_lines.txt,
+what the pre-parser code produced (see legacy_line_parse.py): item
+description, price and categorizer input, or the uncategorized line. Exits
+non-zero on any difference.
+
+The corpus covers parse_line only. process_receipt_text deliberately departs
+from the legacy results: priced total, subtotal and tax lines ("Grand Total
+45.00", "10/14/2026 18:32 TOTAL 7.15") were items there and are left out of a
+receipt's items now, and taxes are summed. golden/receipt.txt is checked at
+the receipt level against golden/receipt.json: item amounts, total, tax and
+timestamp, and the category totals adding up to the items.
+
+    python benchmarks/check_line_parser.py
+    python benchmarks/check_line_parser.py --update   # regenerate from legacy code
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+import legacy_line_parse
+from line_parser import parse_line
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+LINES_PATH = os.path.join(GOLDEN_DIR, "receipt_lines.txt")
+EXPECTED_PATH = os.path.join(GOLDEN_DIR, "receipt_lines.json")
+RECEIPT_PATH = os.path.join(GOLDEN_DIR, "receipt.txt")
+RECEIPT_EXPECTED_PATH = os.path.join(GOLDEN_DIR, "receipt.json")
+
+
+def read_lines():
+    with open(LINES_PATH, encoding="utf-8") as fh:
+        return fh.read().split("\n")
+
+
+def as_record(parsed):
+    """The legacy (outcome, value) shape for a ParsedLine."""
+    if parsed is None:
+        return ["skip", None]
+    if parsed.price is None:
+        return ["uncategorized", parsed.text]
+    if parsed.description and parsed.price > 0:
+        return ["item", [parsed.description, parsed.price, parsed.normalized]]
+    return ["dropped", None]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+    lines = read_lines()
+
+    if args.update:
+        expected = [
+            [line, *map(_jsonable, legacy_line_parse.parse_line(line))] for line in lines
+        ]
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as fh:
+            json.dump(expected, fh, indent=1, ensure_ascii=False)
+            fh.write("\n")
+        print(f"wrote {len(expected)} expected results to {EXPECTED_PATH}")
+        return
+
+    with open(EXPECTED_PATH, encoding="utf-8") as fh:
+        expected = json.load(fh)
+
+    mismatches = 0
+    for line, outcome, value in expected:
+        got = as_record(parse_line(line))
+        if got != [outcome, value]:
+            mismatches += 1
+            print(f"MISMATCH {line!r}\n  expected {[outcome, value]}\n  got      {got}")
+    print(f"{len(expected) - mismatches}/{len(expected)} lines match the golden corpus")
+    if mismatches or not check_receipt():
+        sys.exit(1)
+
+
+def check_receipt():
+    """process_receipt_text on golden/receipt.txt; True when it matches."""
+    import receipts
+
+    receipts.USE_OLLAMA = False  # categories don't matter here, only amounts
+    with open(RECEIPT_PATH, encoding="utf-8") as fh:
+        result = asyncio.run(receipts.process_receipt_text(fh.read()))
+    with open(RECEIPT_EXPECTED_PATH, encoding="utf-8") as fh:
+        expected = json.load(fh)
+
+    item_amounts = [item["amount"] for item in result["line_items"]]
+    got = {
+        "item_amounts": item_amounts,
+        "total": result["total"],
+        "tax": result["tax"],
+        "timestamp": result["timestamp"],
+    }
+    ok = got == expected and round(sum(result["categorized"].values()), 2) == round(
+        sum(item_amounts), 2
+    )
+    if ok:
+        print("golden receipt matches")
+    else:
+        print(f"MISMATCH golden receipt\n  expected {expected}\n  got      {got}")
+        print(f"  categorized {result['categorized']}")
+    return ok
+
+
+def _jsonable(value):
+    return list(value) if isinstance(value, tuple) else value
+
+
+if __name__ == "__main__":
+    main()
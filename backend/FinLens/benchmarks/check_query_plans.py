@@ -0,0 +1,163 @@
+"""
+EXPLAIN-based regression check for the hot per-user queries.
+
+Builds the schema through the Alembic migrations, seeds a few users, runs
+the dashboard, budget and list handlers while capturing every SELECT they
+issue, and EXPLAINs each one. Exits non-zero if any of them reads income,
+expense or budget with a full table (or full index) scan.
+
+    python benchmarks/check_query_plans.py
+    python benchmarks/check_query_plans.py --url mysql+mysqlconnector://root:pw@127.0.0.1:3306/finlens_ci
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import crud  # noqa: E402
+from migrate import upgrade_database  # noqa: E402
+from models import Budget, Expense, Income, User  # noqa: E402
+from reports import budget_alerts, build_dashboard  # noqa: E402
+
+HOT_TABLES = ("income", "expense", "budget")
+SQLITE_SCAN = re.compile(r"\bSCAN (?:TABLE )?(%s)\b" % "|".join(HOT_TABLES))
+
+CATEGORIES = ["Food", "Groceries", "Health", "Shopping", "Utilities", "Transportation"]
+
+
+def hot_paths(db, user):
+    """The handlers whose queries must stay on indexes."""
+    _, cursor = crud.get_expenses_page(db, user_id=user.id, limit=20)
+    return {
+        "dashboard": lambda: build_dashboard(db, user.id),
+        "budget_alerts": lambda: budget_alerts(db, user.id),
+        "get_expenses": lambda: crud.get_expenses(db, user_id=user.id),
+        "get_incomes": lambda: crud.get_incomes(db, user_id=user.id),
+        "expenses_page": lambda: crud.get_expenses_page(
+            db, user_id=user.id, limit=20, cursor=cursor
+        ),
+        "expenses_page_by_category": lambda: crud.get_expenses_page(
+            db, user_id=user.id, limit=20, cursor=cursor, category="Food"
+        ),
+        "incomes_page": lambda: crud.get_incomes_page(
+            db,
+            user_id=user.id,
+            limit=20,
+            start_date=datetime.utcnow() - timedelta(days=90),
+        ),
+    }
+
+
+def seed(Session, users=20, rows_per_user=500):
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    db = Session()
+    for user_id in range(1, users + 1):
+        db.add(User(id=user_id, full_name=f"User {user_id}", email=f"u{user_id}@example.com"))
+        for category in CATEGORIES:
+            db.add(Budget(user_id=user_id, category=category, amount=200))
+        for _ in range(rows_per_user):
+            when = now - timedelta(days=rng.randint(0, 720))
+            db.add(
+                Expense(
+                    user_id=user_id,
+                    category=rng.choice(CATEGORIES),
+                    amount=Decimal(rng.randint(100, 10000)) / 100,
+                    date=when,
+                )
+            )
+            db.add(Income(user_id=user_id, source="Salary", amount=1000, date=when))
+    db.commit()
+    db.close()
+
+
+def explain_sqlite(conn, statement, parameters):
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    details = [row[-1] for row in rows]
+    return details, [d for d in details if SQLITE_SCAN.search(d)]
+
+
+def explain_mysql(conn, statement, parameters):
+    result = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    rows = [dict(zip(result.keys(), row)) for row in result.fetchall()]
+    details = [f"{r['table']}: type={r['type']} key={r['key']}" for r in rows]
+    bad = [
+        d
+        for r, d in zip(rows, details)
+        if r["table"] in HOT_TABLES and r["type"] in ("ALL", "index")
+    ]
+    return details, bad
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'plans.db')}"
+
+    engine = create_engine(url)
+    upgrade_database(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(Session)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else
+                             "ANALYZE TABLE income, expense, budget")
+
+    explain = explain_sqlite if engine.dialect.name == "sqlite" else explain_mysql
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    db = Session()
+    user = SimpleNamespace(id=1)
+    failures = 0
+    for name, run in hot_paths(db, user).items():
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        with engine.connect() as conn:
+            for statement, parameters in captured:
+                details, bad = explain(conn, statement, parameters)
+                if bad or args.verbose:
+                    print(f"[{name}] {' '.join(statement.split())[:160]}")
+                    for detail in details:
+                        print(f"    {'FULL SCAN ' if detail in bad else ''}{detail}")
+                failures += len(bad)
+        print(f"{name}: {len(captured)} queries checked")
+    db.close()
+
+    if tmpdir is not None:
+        engine.dispose()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"FAIL: {failures} full scans on {', '.join(HOT_TABLES)}")
+        sys.exit(1)
+    print("OK: all hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Minimal stand-in for Ollama's /api/generate, for exercising the fallback
+client without a GPU or a model download.
+
+Answers with a category picked by keyword (or "Other") after an artificial
+delay, and counts the requests it served.
+
+    python benchmarks/fake_ollama.py --port 11435 --delay 0.3
+    OLLAMA_URL=http://127.0.0.1:11435 USE_OLLAMA=true uvicorn main:app
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KEYWORDS = {
+    "Groceries": ("milk", "rice", "egg", "onion", "flour"),
+    "Food": ("pizza", "burger", "coffee", "sandwich"),
+    "Health": ("tablet", "syrup", "pharmacy"),
+    "Transportation": ("fuel", "petrol", "taxi", "parking"),
+}
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay: float = 0.0):
+        super().__init__(address, FakeOllamaHandler)
+        self.delay = delay
+        self.request_count = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        item = re.search(r'Item: "(.*)"', body["prompt"]).group(1).lower()
+
+        server = self.server
+        with server._lock:
+            server.request_count += 1
+            server._active += 1
+            server.max_concurrent = max(server.max_concurrent, server._active)
+        try:
+            time.sleep(server.delay)
+            category = next(
+                (c for c, words in KEYWORDS.items() if any(w in item for w in words)),
+                "Other",
+            )
+            payload = json.dumps({"model": body["model"], "response": category}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server._lock:
+                server._active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer((args.host, args.port), delay=args.delay)
+    print(f"Fake Ollama listening on {server.url} (delay {args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
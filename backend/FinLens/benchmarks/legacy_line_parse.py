@@ -0,0 +1,53 @@
+"""
+The receipt line handling as it was before line_parser.py, kept verbatim as
+the reference for the golden corpus and the parser benchmark.
+"""
+import re
+
+from preprocess import preprocess_line
+
+
+def clean_line_start(text: str) -> str:
+    return text.lstrip("=-~*")
+
+
+def strip_price(text: str) -> str:
+    text = re.sub(r"[\s:=~-]*[\$₹€]?\s?\d{1,3}(?:[.,]\d{1,7})?\s*$", "", text)
+    text = re.sub(
+        r"\b\d+\s*(kg|g|lbs|oz|ml|l|pcs|pack|packs|tablet|tabs|bottle|box)\b",
+        "",
+        text,
+        flags=re.IGNORECASE,
+    )
+    text = re.sub(r"[-=~*]+", "", text)
+    text = re.sub(r"(?i)(Tax|Total|Payment Method)", "", text)
+    text = re.sub(r"\b\d{1,2}:\d{2}(?:\s*[ap]m)?\b", "", text, flags=re.IGNORECASE)
+    text = re.sub(
+        r"\b(st|rd|road|ave|avenue|blvd|street)\b", "", text, flags=re.IGNORECASE
+    )
+    return text.strip()
+
+
+def normalize_item_text(text: str) -> str:
+    return preprocess_line(strip_price(text).lower())
+
+
+def parse_line(line: str):
+    """
+    What process_receipt_text and categorize_batch made of one line:
+    ("skip", None), ("item", (description, price, normalized)),
+    ("dropped", None) for a price with no usable description, or
+    ("uncategorized", cleaned_line).
+    """
+    if not line.strip():
+        return "skip", None
+    cleaned_line = clean_line_start(line.strip())
+    price_match = re.search(r"\$?(\d+\.\d{2})", cleaned_line)
+    if price_match:
+        price = float(price_match.group(1))
+        item_text = cleaned_line[: price_match.start()].strip()
+        item_text = strip_price(item_text)
+        if item_text and price > 0:
+            return "item", (item_text, price, normalize_item_text(item_text))
+        return "dropped", None
+    return "uncategorized", cleaned_line
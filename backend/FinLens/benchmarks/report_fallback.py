@@ -0,0 +1,185 @@
+"""
+Fallback rate against accuracy for CATEGORY_CONFIDENCE_THRESHOLD.
+
+For each threshold, items whose predicted category has a probability below
+it go to the fallback. The report shows the share of items sent there, the
+local model's accuracy on the items it keeps, and the accuracy of the whole
+pipeline. Fallback answers come from Ollama with --ollama. Without it, they
+are assumed right at --fallback-accuracy, since Ollama is usually not
+running where this is.
+
+By default the base items of train_model.base_dataset are split into
+--folds folds. For each fold, a model of --engine is trained on the other
+folds' items and scores receipt-style variants of the held-out items: OCR
+misreads, dropped words and extra tokens. No evaluated item is then in the
+training data of the model that scores it. Alternatively, --labels reads a
+CSV with item_text and category columns and scores it with the published
+model.
+
+Either way the report prints how many evaluated texts are, once normalized,
+also training texts, since confidence and accuracy on those say little about
+new receipts.
+
+    python benchmarks/report_fallback.py
+    python benchmarks/report_fallback.py --labels receipts.csv --ollama
+"""
+import argparse
+import asyncio
+import csv
+import random
+
+import bench_db  # noqa: F401 - sets up sys.path
+
+import model_registry
+import utils
+from config import CATEGORIZER_ENGINE
+from line_parser import normalize_item_text
+from train_model import base_dataset, build_dataset, make_model
+
+THRESHOLDS = [0.0, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+MISREADS = {"o": "0", "l": "1", "e": "c", "m": "rn", "i": "l", "s": "5"}
+EXTRA_TOKENS = ["org", "xl", "2pk", "value", "lrg", "sku", "ea", "promo"]
+
+
+def variants(item, rng):
+    words = item.split()
+    out = [item]
+    positions = [i for i, ch in enumerate(item) if ch.lower() in MISREADS]
+    if positions:
+        i = rng.choice(positions)
+        out.append(item[:i] + MISREADS[item[i].lower()] + item[i + 1 :])
+    if len(words) > 1:
+        out.append(" ".join(w for j, w in enumerate(words) if j != rng.randrange(len(words))))
+    out.append(f"{rng.choice(EXTRA_TOKENS)} {item} {rng.choice(EXTRA_TOKENS)}")
+    return out
+
+
+def synthetic_labels(seed, base=None):
+    rng = random.Random(seed)
+    return [
+        (text, category)
+        for category, items in (base or base_dataset).items()
+        for item in items
+        for text in variants(item, rng)
+    ]
+
+
+def base_folds(seed, folds):
+    """(training, held-out) splits of base_dataset, by item within each category."""
+    rng = random.Random(seed)
+    assignment = {}
+    for category, items in base_dataset.items():
+        shuffled = items[:]
+        rng.shuffle(shuffled)
+        assignment[category] = [(item, i % folds) for i, item in enumerate(shuffled)]
+    for fold in range(folds):
+        train, test = {}, {}
+        for category, pairs in assignment.items():
+            train[category] = [item for item, f in pairs if f != fold]
+            held_out = [item for item, f in pairs if f == fold]
+            if held_out:
+                test[category] = held_out
+        yield train, test
+
+
+def training_texts(base):
+    """Normalized texts build_dataset makes from `base`: each item, alone or "x<n>"."""
+    return {
+        normalize_item_text(text)
+        for items in base.values()
+        for item in items
+        for text in (item, f"{item} x1")
+    }
+
+
+def held_out_predictions(seed, folds, engine):
+    """
+    Labels, predictions and confidences for variants of each fold's held-out
+    items, and how many of those are training texts of their fold's model.
+    """
+    labels, predicted, confidences, overlap = [], [], [], 0
+    for train, test in base_folds(seed, folds):
+        df = build_dataset(seed, base=train)
+        model = make_model(engine).fit(list(df["item_text"]), df["category"])
+        fold_labels = synthetic_labels(seed, test)
+        cleaned = [normalize_item_text(text) for text, _ in fold_labels]
+        probabilities = model.predict_proba(cleaned)
+        best = probabilities.argmax(axis=1)
+        labels += fold_labels
+        predicted += [str(model.classes_[column]) for column in best]
+        confidences += [float(row[column]) for row, column in zip(probabilities, best)]
+        seen = training_texts(train)
+        overlap += sum(text in seen for text in cleaned)
+    return labels, predicted, confidences, overlap
+
+
+def read_labels(path):
+    with open(path, newline="", encoding="utf-8") as fh:
+        return [(row["item_text"], row["category"]) for row in csv.DictReader(fh)]
+
+
+async def ollama_answers(texts):
+    from ollama_client import ollama_client
+
+    try:
+        return await ollama_client.categorize_many(texts)
+    finally:
+        await ollama_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", help="CSV with item_text and category columns")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument(
+        "--engine", choices=model_registry.ENGINES, default=CATEGORIZER_ENGINE
+    )
+    parser.add_argument("--ollama", action="store_true", help="ask Ollama for fallback items")
+    parser.add_argument("--fallback-accuracy", type=float, default=0.9)
+    args = parser.parse_args()
+
+    if args.labels:
+        model_registry.load()
+        labels = read_labels(args.labels)
+        cleaned = [normalize_item_text(text) for text, _ in labels]
+        predicted, confidences = utils.categorize_with_confidence(cleaned)
+        seen = training_texts(base_dataset)
+        overlap = sum(text in seen for text in cleaned)
+        evaluated = f"{args.labels}, published {model_registry.get_version()} model"
+    else:
+        labels, predicted, confidences, overlap = held_out_predictions(
+            args.seed, args.folds, args.engine
+        )
+        evaluated = f"held-out base items, {args.folds} folds, {args.engine} engine"
+    texts = [text for text, _ in labels]
+    truth = [category for _, category in labels]
+    local_right = [p == t for p, t in zip(predicted, truth)]
+
+    fallback_right = None
+    if args.ollama:
+        answers = asyncio.run(ollama_answers(texts))
+        fallback_right = [a == t for a, t in zip(answers, truth)]
+
+    n = len(labels)
+    source = "Ollama" if args.ollama else f"assumed {args.fallback_accuracy:.0%}"
+    print(f"{n} labelled items: {evaluated}")
+    print(f"local model accuracy {sum(local_right) / n:.1%}")
+    print(f"also training texts: {overlap} ({overlap / n:.1%})")
+    print(f"fallback accuracy: {source}")
+    print(f"{'threshold':>9} {'fallback':>9} {'kept acc':>9} {'overall':>8}")
+    for threshold in THRESHOLDS:
+        sent = [c < threshold for c in confidences]
+        kept = [right for right, s in zip(local_right, sent) if not s]
+        n_sent = sum(sent)
+        if fallback_right is not None:
+            fallback_correct = sum(r for r, s in zip(fallback_right, sent) if s)
+        else:
+            fallback_correct = n_sent * args.fallback_accuracy
+        overall = (sum(kept) + fallback_correct) / n
+        kept_accuracy = f"{sum(kept) / len(kept):.1%}" if kept else "-"
+        print(f"{threshold:>9.1f} {n_sent / n:>9.1%} {kept_accuracy:>9} {overall:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,144 @@
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-MYSQL_DATABASE_URL = (
+# Database URL; defaults to a local XAMPP MySQL socket
+MYSQL_DATABASE_URL = os.getenv(
+    "DATABASE_URL",
     "mysql+mysqlconnector://root@localhost:3306/finlens"
-    "?unix_socket=/Applications/XAMPP/xamppfiles/var/mysql/mysql.sock"
+    "?unix_socket=/Applications/XAMPP/xamppfiles/var/mysql/mysql.sock",
+)
+
+# Connection pool, per engine: DB_POOL_SIZE connections kept open plus up to
+# DB_MAX_OVERFLOW more under load, waiting at most DB_POOL_TIMEOUT seconds for
+# a free one. Connections are replaced after DB_POOL_RECYCLE seconds (keep it
+# below MySQL's wait_timeout) and, with DB_POOL_PRE_PING, checked before use.
+# DB_STATEMENT_TIMEOUT_MS makes the server abort longer statements (MySQL:
+# SELECTs only; 0 = no limit); statements slower than DB_SLOW_STATEMENT_MS are
+# logged. Timings are served at GET /api/v1/db/metrics
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+DB_SLOW_STATEMENT_MS = float(os.getenv("DB_SLOW_STATEMENT_MS", 500))
+
+# Async database access for the dashboard, budget and income/expense routes.
+# With ASYNC_DB on they await an async engine instead of holding a threadpool
+# thread per request; ASYNC_DATABASE_URL defaults to the MySQL URL above with
+# the asyncmy driver (use mysql+aiomysql://... or sqlite+aiosqlite://... to
+# pick another)
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() == "true"
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    re.sub(r"^mysql(\+\w+)?://", "mysql+asyncmy://", MYSQL_DATABASE_URL),
 )
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Receipt categorizer artifacts (produced offline by `python train_model.py train`).
+# CATEGORIZER_ENGINE picks "pipeline" (CountVectorizer + NB) or "hashing" (see
+# hashing_categorizer.py); each engine has its own manifest in MODEL_DIR unless
+# MODEL_MANIFEST names one
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(BASE_DIR, "artifacts"))
+CATEGORIZER_ENGINE = os.getenv("CATEGORIZER_ENGINE", "pipeline")
+MODEL_MANIFEST = os.getenv("MODEL_MANIFEST", "")
+
+# OCR process pool: number of Tesseract worker processes and how many scans may
+# wait for a free worker before new ones are rejected with 429
+OCR_POOL_WORKERS = int(os.getenv("OCR_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+OCR_POOL_QUEUE_DEPTH = int(os.getenv("OCR_POOL_QUEUE_DEPTH", OCR_POOL_WORKERS * 2))
+
+# Queued OCR jobs (POST /ocr/jobs). Jobs are processed by `python ocr_jobs.py
+# worker` processes, and also inside the API when OCR_JOB_WORKER_IN_API is on.
+# OCR_JOB_CONCURRENCY bounds jobs in progress per worker process; a job taking
+# longer than OCR_JOB_TIMEOUT seconds counts as a failed attempt. Tesseract
+# itself is killed after OCR_TESSERACT_TIMEOUT seconds (0: never), so a timed-out
+# job does not keep a pool worker busy behind the retry
+OCR_JOB_WORKER_IN_API = os.getenv("OCR_JOB_WORKER_IN_API", "true").lower() == "true"
+OCR_JOB_CONCURRENCY = int(os.getenv("OCR_JOB_CONCURRENCY", OCR_POOL_WORKERS))
+OCR_JOB_TIMEOUT = float(os.getenv("OCR_JOB_TIMEOUT", 120))
+OCR_TESSERACT_TIMEOUT = float(os.getenv("OCR_TESSERACT_TIMEOUT", OCR_JOB_TIMEOUT))
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv("OCR_JOB_MAX_ATTEMPTS", 3))
+OCR_JOB_POLL_INTERVAL = float(os.getenv("OCR_JOB_POLL_INTERVAL", 1.0))
+
+# Batch scanning: most images + PDF pages accepted in one request
+OCR_BATCH_MAX_PAGES = int(os.getenv("OCR_BATCH_MAX_PAGES", 50))
+
+# Image preprocessing before Tesseract. Photos are downscaled to OCR_TARGET_DPI,
+# estimating their DPI from OCR_RECEIPT_WIDTH_INCHES (the receipt's assumed
+# width) when the file does not say; OCR_TESSERACT_PSM is Tesseract's
+# page-segmentation mode (3 = automatic, 4 = single column, 6 = single block)
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() == "true"
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", 300))
+OCR_RECEIPT_WIDTH_INCHES = float(os.getenv("OCR_RECEIPT_WIDTH_INCHES", 3.5))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() == "true"
+OCR_DESKEW = os.getenv("OCR_DESKEW", "true").lower() == "true"
+OCR_TESSERACT_PSM = int(os.getenv("OCR_TESSERACT_PSM", 3))
+
+# Scan results cached by image content: entries kept in memory, and an optional
+# on-disk tier (enabled by setting OCR_CACHE_DIR) capped at OCR_CACHE_DISK_BYTES
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 1024))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+OCR_CACHE_DISK_BYTES = int(os.getenv("OCR_CACHE_DISK_BYTES", 256 * 1024 * 1024))
+
+# Receipts from a merchant in the merchant index are categorized as a whole when
+# the match confidence (name similarity x category share) reaches this; history
+# saved by other workers is picked up every MERCHANT_INDEX_REFRESH seconds
+MERCHANT_MATCH_CONFIDENCE = float(os.getenv("MERCHANT_MATCH_CONFIDENCE", 0.8))
+MERCHANT_INDEX_REFRESH = float(os.getenv("MERCHANT_INDEX_REFRESH", 600))
+
+# Users' category corrections: each user's overrides are cached in memory. With
+# ONLINE_MODEL enabled, items are categorized by an incrementally trained model
+# that folds in everyone's corrections every ONLINE_MODEL_UPDATE_INTERVAL
+# seconds, each counting ONLINE_MODEL_CORRECTION_WEIGHT training samples
+CATEGORY_OVERRIDE_CACHE_SIZE = int(os.getenv("CATEGORY_OVERRIDE_CACHE_SIZE", 10000))
+CATEGORY_OVERRIDE_CACHE_TTL = float(os.getenv("CATEGORY_OVERRIDE_CACHE_TTL", 60))
+ONLINE_MODEL = os.getenv("ONLINE_MODEL", "false").lower() == "true"
+ONLINE_MODEL_UPDATE_INTERVAL = float(os.getenv("ONLINE_MODEL_UPDATE_INTERVAL", 300))
+ONLINE_MODEL_CORRECTION_WEIGHT = float(os.getenv("ONLINE_MODEL_CORRECTION_WEIGHT", 5))
+ONLINE_MODEL_SEED = int(os.getenv("ONLINE_MODEL_SEED", 42))
+
+# Ollama fallback for items the local categorizer can't place: those whose
+# predicted category has a probability below CATEGORY_CONFIDENCE_THRESHOLD
+USE_OLLAMA = os.getenv("USE_OLLAMA", "false").lower() == "true"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 10))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 8))
+OLLAMA_CONCURRENCY_PER_RECEIPT = int(os.getenv("OLLAMA_CONCURRENCY_PER_RECEIPT", 4))
+OLLAMA_CACHE_SIZE = int(os.getenv("OLLAMA_CACHE_SIZE", 4096))
+OLLAMA_CACHE_TTL = float(os.getenv("OLLAMA_CACHE_TTL", 24 * 3600))
+CATEGORY_CONFIDENCE_THRESHOLD = float(os.getenv("CATEGORY_CONFIDENCE_THRESHOLD", 0.5))
+
+# Apply pending migrations when the API starts. Disable when several workers boot
+# together and run `python migrate.py` once as a deploy step instead.
+RUN_MIGRATIONS_ON_STARTUP = (
+    os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+)
+
+# Per-user dashboard cache. Entries are dropped when that user's income or expense
+# changes in this process; the TTL bounds staleness across workers and lets the
+# 30/60-day windows roll forward.
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 10000))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", 300))
+
+# Authenticated user records cached in-process, keyed by the token's user id
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+
+# Password hashing: bcrypt cost factor and the size of the dedicated hashing pool.
+# Raising BCRYPT_ROUNDS rehashes existing passwords on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+# Bulk ingestion: rows per INSERT/commit, and the most rows accepted per request
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", 50000))
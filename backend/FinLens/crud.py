@@ -1,18 +1,33 @@
+from sqlalchemy import desc, or_
 from sqlalchemy.orm import Session
-from models import User, Income, Expense
-from schemas import UserCreate, IncomeCreate, ExpenseCreate
+from models import User, Income, Expense, Budget
+from schemas import UserCreate, IncomeCreate, ExpenseCreate, BudgetCreate
 from auth import get_password_hash
+from reports import invalidate_dashboard
+from merchants import merchant_index
+import rollup
 from typing import Optional
+from datetime import datetime
+import base64
+import json
 
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
 
+def get_user_by_id(db: Session, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
+
+
 def create_user(
-    db: Session, user: UserCreate, profile_image_path: Optional[str] = None
+    db: Session,
+    user: UserCreate,
+    profile_image_path: Optional[str] = None,
+    hashed_password: Optional[str] = None,
 ):
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         full_name=user.full_name,
         email=user.email,
@@ -25,6 +40,11 @@ def create_user(
     return db_user
 
 
+def update_password_hash(db: Session, user: User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+
+
 # Income CRUD operations
 def create_income(db: Session, income: IncomeCreate, user_id: int):
     db_income = Income(
@@ -35,8 +55,10 @@ def create_income(db: Session, income: IncomeCreate, user_id: int):
         user_id=user_id,
     )
     db.add(db_income)
+    rollup.record(db, user_id, "income", income.source, income.date, income.amount)
     db.commit()
     db.refresh(db_income)
+    invalidate_dashboard(user_id)
     return db_income
 
 
@@ -44,12 +66,28 @@ def get_incomes(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     return (
         db.query(Income)
         .filter(Income.user_id == user_id)
+        .order_by(desc(Income.date), desc(Income.id))
         .offset(skip)
         .limit(limit)
         .all()
     )
 
 
+def get_incomes_page(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    source: Optional[str] = None,
+):
+    filters = [Income.source == source] if source is not None else []
+    return _keyset_page(
+        db, Income, user_id, limit, cursor, start_date, end_date, filters
+    )
+
+
 def get_income_by_id(db: Session, income_id: int, user_id: int):
     return (
         db.query(Income)
@@ -65,8 +103,18 @@ def delete_income(db: Session, income_id: int, user_id: int):
         .first()
     )
     if db_income:
+        rollup.record(
+            db,
+            user_id,
+            "income",
+            db_income.source,
+            db_income.date,
+            -db_income.amount,
+            count=-1,
+        )
         db.delete(db_income)
         db.commit()
+        invalidate_dashboard(user_id)
         return True
     return False
 
@@ -78,11 +126,18 @@ def create_expense(db: Session, expense: ExpenseCreate, user_id: int):
         amount=expense.amount,
         date=expense.date,
         icon=expense.icon,
+        merchant=expense.merchant,
         user_id=user_id,
     )
     db.add(db_expense)
+    rollup.record(
+        db, user_id, "expense", expense.category, expense.date, expense.amount
+    )
     db.commit()
     db.refresh(db_expense)
+    invalidate_dashboard(user_id)
+    if expense.merchant:
+        merchant_index.add(expense.merchant, expense.category, user_id)
     return db_expense
 
 
@@ -90,12 +145,28 @@ def get_expenses(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     return (
         db.query(Expense)
         .filter(Expense.user_id == user_id)
+        .order_by(desc(Expense.date), desc(Expense.id))
         .offset(skip)
         .limit(limit)
         .all()
     )
 
 
+def get_expenses_page(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[str] = None,
+):
+    filters = [Expense.category == category] if category is not None else []
+    return _keyset_page(
+        db, Expense, user_id, limit, cursor, start_date, end_date, filters
+    )
+
+
 def get_expense_by_id(db: Session, expense_id: int, user_id: int):
     return (
         db.query(Expense)
@@ -111,7 +182,103 @@ def delete_expense(db: Session, expense_id: int, user_id: int):
         .first()
     )
     if db_expense:
+        rollup.record(
+            db,
+            user_id,
+            "expense",
+            db_expense.category,
+            db_expense.date,
+            -db_expense.amount,
+            count=-1,
+        )
         db.delete(db_expense)
         db.commit()
+        invalidate_dashboard(user_id)
         return True
     return False
+
+
+# Budget CRUD operations
+def upsert_budget(db: Session, user_id: int, budget: BudgetCreate):
+    # Check if budget already exists for this category and user
+    existing_budget = (
+        db.query(Budget)
+        .filter(Budget.user_id == user_id, Budget.category == budget.category)
+        .first()
+    )
+
+    if existing_budget:
+        # Update existing budget (updated_at is set by the column's onupdate)
+        existing_budget.amount = budget.amount
+        existing_budget.icon = budget.icon
+        db.commit()
+        db.refresh(existing_budget)
+        return existing_budget
+    else:
+        # Create new budget
+        new_budget = Budget(
+            user_id=user_id,
+            category=budget.category,
+            amount=budget.amount,
+            icon=budget.icon,
+        )
+        db.add(new_budget)
+        db.commit()
+        db.refresh(new_budget)
+        return new_budget
+
+
+def get_budgets(db: Session, user_id: int):
+    return db.query(Budget).filter(Budget.user_id == user_id).all()
+
+
+# Keyset pagination on (date, id), newest first
+def encode_cursor(date: datetime, row_id: int) -> str:
+    raw = json.dumps([date.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (date, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(date), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _keyset_page(
+    db: Session,
+    model,
+    user_id: int,
+    limit: int,
+    cursor: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    filters,
+):
+    """
+    One page of a user's rows ordered by (date, id) descending, plus the cursor
+    for the next page (None on the last page). Seeks past the cursor instead of
+    using OFFSET, so every page costs the same however deep it is.
+    """
+    query = db.query(model).filter(model.user_id == user_id, *filters)
+    if start_date is not None:
+        query = query.filter(model.date >= start_date)
+    if end_date is not None:
+        query = query.filter(model.date < end_date)
+    if cursor is not None:
+        after_date, after_id = decode_cursor(cursor)
+        # The plain `date <= ...` bound is what lets the (user_id, date) index
+        # seek straight to the cursor; the OR alone would be a filter
+        query = query.filter(
+            model.date <= after_date,
+            or_(model.date < after_date, model.id < after_id),
+        )
+
+    rows = query.order_by(desc(model.date), desc(model.id)).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].date, rows[-1].id)
@@ -1,8 +1,43 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from config import MYSQL_DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from config import MYSQL_DATABASE_URL, ASYNC_DB, ASYNC_DATABASE_URL
+from engine_metrics import engine_options, instrument
 
-engine = create_engine(MYSQL_DATABASE_URL)
+engine = create_engine(MYSQL_DATABASE_URL, **engine_options(MYSQL_DATABASE_URL))
+instrument(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Async engine for the routes that take get_async_db, only created when
+# ASYNC_DB is on so the async driver is only needed then
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True)
+    )
+    instrument(async_engine.sync_engine, "async")
+    # Objects are returned to the route after the session's greenlet is done,
+    # so attributes must not expire (and lazily reload) on commit
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+class ThreadpoolSession:
+    """
+    AsyncSession.run_sync over a sync Session, for when ASYNC_DB is off: the
+    function runs in Starlette's threadpool, as a sync route would.
+    """
+
+    def __init__(self, db: Session):
+        self.sync_session = db
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
@@ -1,10 +1,15 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Union
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from schemas import TokenData, UserResponse
-from crud import get_user_by_email
-from database import SessionLocal
+from crud import get_user_by_email, get_user_by_id
+from database import SessionLocal, AsyncSessionLocal, ThreadpoolSession
 from config import SECRET_KEY, ALGORITHM
+from auth import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -17,9 +22,42 @@ def get_db():
         db.close()
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: SessionLocal = Depends(get_db)
-) -> UserResponse:
+@asynccontextmanager
+async def async_session() -> AsyncIterator[Union[AsyncSession, ThreadpoolSession]]:
+    """
+    A session for async code, used through `await db.run_sync(fn, *args)`
+    with the same sync CRUD functions get_db sessions are passed to. With
+    ASYNC_DB it is an AsyncSession, so waiting on the database holds no
+    thread; otherwise a SessionLocal session whose calls run in the threadpool.
+    """
+    if AsyncSessionLocal is None:
+        db = ThreadpoolSession(SessionLocal())
+    else:
+        db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+
+def _load_user(db, user_id, email: str):
+    if user_id is not None:
+        return get_user_by_id(db, user_id)
+    # Tokens issued before the uid claim existed
+    return get_user_by_email(db, email)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
+    """
+    Resolve the bearer token to a user. Tokens carry the user id, so the
+    record is served from the in-process user cache and the database is only
+    hit on a miss.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,9 +69,26 @@ def get_current_user(
         if email is None:
             raise credentials_exception
         token_data = TokenData(sub=email)  # Using TokenData for validation
+        user_id = payload.get("uid")
     except JWTError:
         raise credentials_exception
-    user = get_user_by_email(db, email=token_data.sub)
+
+    user = user_cache.get(user_id) if user_id is not None else None
     if user is None:
+        async with async_session() as db:
+            record = await db.run_sync(_load_user, user_id, token_data.sub)
+        if record is None:
+            raise credentials_exception
+        user = UserResponse(
+            id=record.id,
+            full_name=record.full_name,
+            email=record.email,
+            created_at=record.created_at,
+            profile_image=record.profile_image,
+        )
+        user_cache.set(user.id, user)
+
+    # The token must still belong to the account it was issued for
+    if user.email != token_data.sub:
         raise credentials_exception
     return user
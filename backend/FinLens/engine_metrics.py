@@ -0,0 +1,151 @@
+"""
+Engine configuration and instrumentation.
+
+Every engine the app creates goes through `engine_options` (pool settings
+from config) and `instrument`, which records into `metrics.db_metrics`:
+- `<engine>.<verb>`: statement latency in the driver, per SQL verb
+  (select, including WITH queries; insert; update; delete; other);
+- `<engine>.pool_wait`: time to get a connection from the pool, including
+  opening a new one when the pool grows.
+
+A slow request with a long pool_wait is waiting for a connection (raise
+DB_POOL_SIZE/DB_MAX_OVERFLOW, or find what holds them); one whose
+statements are slow is waiting on MySQL.
+"""
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_SLOW_STATEMENT_MS,
+)
+from metrics import db_metrics
+
+logger = logging.getLogger(__name__)
+
+# First word of a statement -> the verb it is timed under (anything else: other)
+VERBS = {
+    "select": "select",
+    "with": "select",
+    "insert": "insert",
+    "update": "update",
+    "delete": "delete",
+}
+
+
+class _TimedCheckout:
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_metrics.record(
+                f"{self.metrics_label}.pool_wait", time.perf_counter() - started
+            )
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine/create_async_engine keyword arguments for `url`."""
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    in_memory = parsed.database in (None, "", ":memory:")
+    if parsed.get_backend_name() == "sqlite" and in_memory:
+        # In-memory SQLite lives in one connection; keep SQLAlchemy's pool for it
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _statement_timeout_sql(engine: Engine):
+    """Session-level statement timeout for the engine's server, if it has one."""
+    if not DB_STATEMENT_TIMEOUT_MS:
+        return None
+    dialect = engine.dialect
+    if dialect.name == "mysql":
+        if getattr(dialect, "is_mariadb", False):
+            return f"SET SESSION max_statement_time = {DB_STATEMENT_TIMEOUT_MS / 1000}"
+        return f"SET SESSION max_execution_time = {DB_STATEMENT_TIMEOUT_MS}"
+    if dialect.name == "postgresql":
+        return f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}"
+    return None
+
+
+def instrument(engine: Engine, label: str) -> None:
+    """
+    Statement timing and the statement timeout on `engine` (for an async
+    engine, its sync_engine).
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_statement_timeout(dbapi_connection, connection_record):
+        # Runs after the first connection has told the dialect the server type
+        sql = _statement_timeout_sql(engine)
+        if sql:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(sql)
+            cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        _record(conn, statement, label)
+
+    @event.listens_for(engine, "handle_error")
+    def failed(exception_context):
+        # Failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and exception_context.statement is not None:
+            _record(conn, exception_context.statement, label)
+
+
+def _record(conn, statement: str, label: str) -> None:
+    started = conn.info.get("statement_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    words = statement.split(None, 1)
+    verb = VERBS.get(words[0].lower(), "other") if words else "other"
+    db_metrics.record(f"{label}.{verb}", elapsed)
+    if elapsed * 1000 >= DB_SLOW_STATEMENT_MS:
+        logger.warning(f"Slow statement ({elapsed * 1000:.0f} ms): {statement[:500]}")
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout_s": pool.timeout(),
+    }
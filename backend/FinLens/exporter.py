@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from sqlalchemy import desc, select
+
+from database import SessionLocal
+from models import Expense, Income
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "xlsx": XLSX_MEDIA_TYPE,
+}
+
+EXPORT_COLUMNS = {
+    Expense: ["id", "user_id", "category", "icon", "amount", "date"],
+    Income: ["id", "user_id", "source", "icon", "amount", "date"],
+}
+
+FETCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_rows(model, user_id: int, columns: Sequence[str]) -> Iterator[tuple]:
+    """
+    Yield the user's full history as plain tuples, newest first, fetching
+    FETCH_SIZE rows at a time through a server-side cursor where the driver
+    supports one. Uses its own session because the response body is produced
+    after the request's dependencies have been torn down.
+    """
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(*(getattr(model, column) for column in columns))
+            .where(model.user_id == user_id)
+            .order_by(desc(model.date), desc(model.id))
+            .execution_options(stream_results=True, yield_per=FETCH_SIZE)
+        )
+        for partition in db.execute(stmt).partitions():
+            yield from partition
+    finally:
+        db.close()
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(rows: Iterator[tuple], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def stream_ndjson(rows: Iterator[tuple], columns: List[str]) -> Iterator[bytes]:
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps({c: _json_value(v) for c, v in zip(columns, row)}) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+    yield "".join(chunk).encode()
+
+
+def stream_xlsx(rows: Iterator[tuple], columns: List[str]) -> Iterator[bytes]:
+    """
+    XLSX is a zip archive, so it can only be sent once complete. A write-only
+    workbook spools rows to disk as they are appended, which keeps memory flat;
+    the finished file is then streamed back in chunks and removed.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([float(v) if isinstance(v, Decimal) else v for v in row])
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as fh:
+            while chunk := fh.read(CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+STREAMERS = {"csv": stream_csv, "ndjson": stream_ndjson, "xlsx": stream_xlsx}
+
+
+def export_response(model, user_id: int, export_format: str, name: str):
+    """StreamingResponse with the user's full history of `model` in `export_format`."""
+    columns = EXPORT_COLUMNS[model]
+    body = STREAMERS[export_format](iter_rows(model, user_id, columns), columns)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format}"'
+        },
+    )
@@ -0,0 +1,112 @@
+"""
+Hashing-vectorizer categorizer engine (CATEGORIZER_ENGINE=hashing).
+
+Items are hashed into word unigram/bigram and character 4-gram features, so
+there is no vocabulary to keep or look up. Training goes through sklearn's
+HashingVectorizer and MultinomialNB. Afterwards only what inference needs
+is kept as NumPy arrays:
+- the sorted indices of the features seen in training;
+- their per-class log probabilities;
+- the class log priors.
+
+A feature never seen in training has the same log probability under NB for
+every index, so all unseen features share one extra row of the weight
+matrix. Inference hashes an item's n-grams with the same murmurhash and
+modulo as HashingVectorizer, maps them into the compact matrix with a binary
+search, and sums the matching rows per item (the sparse dot product) before
+an argmax. No sparse matrix is built and sklearn validation is skipped;
+results equal MultinomialNB's.
+"""
+import re
+from typing import List
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.utils import murmurhash3_32
+
+N_FEATURES = 2 ** 20
+CHAR_NGRAM = 4
+
+TOKEN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def analyze(text: str) -> List[str]:
+    """Word 1-2-grams and character 4-grams within words (padded by a space).
+    Character grams are marked so they hash apart from words."""
+    text = text.lower()
+    words = TOKEN.findall(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in text.split():
+        padded = f" {word} "
+        grams += [
+            "#" + padded[i : i + CHAR_NGRAM] for i in range(len(padded) - CHAR_NGRAM + 1)
+        ]
+    return grams
+
+
+class HashingCategorizer:
+    def __init__(self, n_features: int = N_FEATURES, alpha: float = 1.0):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.classes_ = np.array([])
+        self.columns = np.empty(0, dtype=np.int64)  # hashed features seen in training
+        self.weights = np.empty((1, 0), dtype=np.float32)  # one row per column, + unseen
+        self.prior = np.empty(0, dtype=np.float32)
+
+    def fit(self, texts, labels) -> "HashingCategorizer":
+        vectorizer = HashingVectorizer(
+            analyzer=analyze,
+            n_features=self.n_features,
+            alternate_sign=False,
+            norm=None,
+        )
+        nb = MultinomialNB(alpha=self.alpha)
+        nb.fit(vectorizer.transform(texts), labels)
+        seen = np.flatnonzero(nb.feature_count_.sum(axis=0))
+        # Columns no class has seen share the smoothed log probability of a zero count
+        unseen = np.log(self.alpha) - np.log(
+            nb.feature_count_.sum(axis=1) + self.alpha * self.n_features
+        )
+        self.classes_ = nb.classes_
+        self.columns = seen.astype(np.int64)
+        self.weights = np.vstack([nb.feature_log_prob_[:, seen].T, unseen]).astype(
+            np.float32
+        )
+        self.prior = nb.class_log_prior_.astype(np.float32)
+        return self
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        """Per-class NB joint log likelihood, shape (len(texts), n_classes)."""
+        counts = np.empty(len(texts), dtype=np.int64)
+        hashes = []
+        for i, text in enumerate(texts):
+            grams = analyze(text)
+            counts[i] = len(grams)
+            hashes += map(murmurhash3_32, grams)
+        # HashingVectorizer's feature index: |signed murmurhash| mod n_features
+        features = np.abs(np.array(hashes, dtype=np.int64)) % self.n_features
+
+        # Rows of the compact weight matrix; features not seen in training
+        # map to the last row
+        rows = np.searchsorted(self.columns, features)
+        found = rows < len(self.columns)
+        found[found] = self.columns[rows[found]] == features[found]
+        rows[~found] = len(self.columns)
+
+        scores = np.zeros((len(texts), len(self.classes_)), dtype=np.float32)
+        nonempty = counts > 0
+        if nonempty.any():
+            starts = np.cumsum(counts) - counts
+            scores[nonempty] = np.add.reduceat(self.weights[rows], starts[nonempty])
+        return scores + self.prior
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        return self.classes_[self.decision_function(texts).argmax(axis=1)]
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
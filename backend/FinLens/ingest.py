@@ -0,0 +1,237 @@
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import rollup
+import utils
+from config import BULK_CHUNK_SIZE
+from merchants import merchant_index
+from models import Expense, Income
+from reports import invalidate_dashboard
+from schemas import ExpenseCreate, IncomeCreate
+
+# kind -> (model, create schema, label column)
+KINDS = {
+    "expense": (Expense, ExpenseCreate, "category"),
+    "income": (Income, IncomeCreate, "source"),
+}
+
+# Placeholder for an OFX transaction of the other kind: skipped, but it keeps
+# its place so reported row numbers match positions in the file
+SKIPPED = object()
+
+STMTTRN = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def parse_csv(content: bytes) -> List[Dict[str, Any]]:
+    """Rows of a CSV file with a header line; columns match the create schema."""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    return [
+        {
+            key.strip().lower(): (value.strip() if value else None)
+            for key, value in row.items()
+            if key
+        }
+        for row in reader
+    ]
+
+
+def _ofx_date(value: str) -> datetime:
+    digits = re.match(r"\d+", value.strip()).group(0)
+    return datetime.strptime(digits[:14].ljust(14, "0"), "%Y%m%d%H%M%S")
+
+
+def parse_ofx(content: bytes, kind: str) -> List[Dict[str, Any]]:
+    """
+    Statement transactions from an OFX/QFX file. Debits become expenses,
+    categorized from the payee name by the local model; credits become income
+    with the payee as source. Transactions of the other kind come back as
+    SKIPPED placeholders. The payee is not stored as an expense's merchant:
+    its category is the model's guess, not the user's, and would only teach
+    the merchant history what the model already thinks.
+    """
+    transactions = []
+    for block in STMTTRN.findall(content.decode("utf-8", errors="replace")):
+        fields = {tag.upper(): value.strip() for tag, value in OFX_FIELD.findall(block)}
+        transactions.append(fields)
+
+    rows = []
+    for fields in transactions:
+        try:
+            amount = Decimal(fields["TRNAMT"])
+            date = _ofx_date(fields["DTPOSTED"])
+            if not amount.is_finite():
+                raise ValueError(amount)
+        except (KeyError, ArithmeticError, AttributeError, ValueError):
+            rows.append({"error": "Missing or invalid TRNAMT/DTPOSTED"})
+            continue
+        if (amount < 0) != (kind == "expense"):
+            rows.append(SKIPPED)
+            continue
+        payee = fields.get("NAME") or fields.get("MEMO") or "Unknown"
+        rows.append({"label": payee, "amount": abs(amount), "date": date, "icon": None})
+
+    if kind == "expense":
+        labelled = [row for row in rows if row is not SKIPPED and "label" in row]
+        for row, category in zip(
+            labelled, utils.categorize_batch([row["label"] for row in labelled])
+        ):
+            row["category"] = category
+    label_field = KINDS[kind][2]
+    for row in rows:
+        if row is not SKIPPED and "label" in row:
+            payee = row.pop("label")
+            row.setdefault(label_field, payee)
+    return rows
+
+
+def validate_rows(
+    rows: List[Dict[str, Any]], schema: BaseModel
+) -> Tuple[List[Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    """Validate every row; return (row number, model) pairs and per-row errors."""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if row is SKIPPED:
+            continue
+        if not isinstance(row, dict):
+            errors.append({"row": number, "error": "Expected an object"})
+            continue
+        if "error" in row:
+            errors.append({"row": number, "error": row["error"]})
+            continue
+        try:
+            valid.append((number, schema(**{"icon": None, **row})))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            )
+            errors.append({"row": number, "error": message})
+    return valid, errors
+
+
+def _insert_chunk(
+    db: Session, kind: str, chunk: List[Tuple[int, BaseModel]], user_id: int
+) -> None:
+    """
+    One executemany INSERT plus the rollup deltas for `chunk`, committed
+    together. Expenses saved with a merchant feed the user's merchant history.
+    """
+    model, _, label_field = KINDS[kind]
+    values = []
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for _, item in chunk:
+        label = getattr(item, label_field)
+        amount = Decimal(str(item.amount))
+        row = {
+            "user_id": user_id,
+            label_field: label,
+            "amount": amount,
+            "date": item.date,
+            "icon": item.icon,
+        }
+        if kind == "expense":
+            row["merchant"] = item.merchant
+        values.append(row)
+        delta = deltas[(user_id, kind, rollup.month_start(item.date), label)]
+        delta[0] += amount
+        delta[1] += 1
+
+    db.execute(insert(model), values)
+    rollup.record_many(db, {key: tuple(value) for key, value in deltas.items()})
+    db.commit()
+    if kind == "expense":
+        for _, item in chunk:
+            if item.merchant:
+                merchant_index.add(item.merchant, item.category, user_id)
+
+
+def bulk_insert(
+    db: Session,
+    kind: str,
+    items: List[Tuple[int, BaseModel]],
+    user_id: int,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Insert validated rows with one executemany INSERT and one commit per chunk,
+    updating the monthly rollup in the same transaction. A chunk that fails is
+    rolled back and retried one row at a time, so only the rows that fail on
+    their own are reported; later chunks still go in.
+    """
+    inserted, errors = 0, []
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start : start + chunk_size]
+        try:
+            _insert_chunk(db, kind, chunk, user_id)
+            inserted += len(chunk)
+            continue
+        except Exception:
+            db.rollback()
+        for number, item in chunk:
+            try:
+                _insert_chunk(db, kind, [(number, item)], user_id)
+                inserted += 1
+            except Exception as e:
+                db.rollback()
+                errors.append(
+                    {"row": number, "error": f"Insert failed: {e.__class__.__name__}"}
+                )
+
+    if inserted:
+        invalidate_dashboard(user_id)
+    return inserted, errors
+
+
+def _is_ofx(filename: str, content: bytes) -> bool:
+    if filename.lower().endswith((".ofx", ".qfx")):
+        return True
+    head = content[:1024].upper()
+    return b"OFXHEADER" in head or b"<OFX>" in head
+
+
+async def rows_from_request(request: Request, kind: str) -> List[Dict[str, Any]]:
+    """
+    Raw rows from a bulk request: either a JSON array body or a multipart
+    upload whose `file` is CSV or OFX. Raises ValueError on a malformed body.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise ValueError("Multipart body must include a 'file' field")
+        content = await upload.read()
+        if _is_ofx(upload.filename or "", content):
+            return await run_in_threadpool(parse_ofx, content, kind)
+        try:
+            return await run_in_threadpool(parse_csv, content)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"Could not parse CSV: {e}")
+
+    try:
+        rows = await request.json()
+    except ValueError:
+        raise ValueError("Body must be a JSON array of rows")
+    if not isinstance(rows, list):
+        raise ValueError("Body must be a JSON array of rows")
+    return rows
+
+
+def ingest(db: Session, kind: str, rows: List[Dict[str, Any]], user_id: int) -> dict:
+    """Validate and insert `rows`, returning a BulkIngestResponse-shaped dict."""
+    items, errors = validate_rows(rows, KINDS[kind][1])
+    inserted, insert_errors = bulk_insert(db, kind, items, user_id)
+    errors = sorted(errors + insert_errors, key=lambda error: error["row"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
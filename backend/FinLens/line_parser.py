@@ -0,0 +1,141 @@
+"""
+Receipt line parsing with precompiled patterns.
+
+Each OCR line is cleaned and searched for its price once, and one more
+search classifies it as a total, subtotal or tax line, or failing that a
+timestamp line. Item
+descriptions are stripped of trailing prices, units, decoration and receipt
+vocabulary in four passes where there used to be six.
+
+The passes can't be merged further without changing results: removing
+decoration or vocabulary joins the characters around it ("Main-St" becomes
+"MainSt"), which changes what the later word-boundary patterns match. Within
+each pass the merged patterns cannot affect one another. Descriptions and
+categorizer input are identical to the previous per-step `re.sub` code; see
+benchmarks/check_line_parser.py and its golden corpus.
+"""
+import re
+from typing import NamedTuple, Optional
+
+from preprocess import preprocess_line
+
+UNITS = "kg|g|lbs|oz|ml|l|pcs|pack|packs|tablet|tabs|bottle|box"
+
+PRICE = re.compile(r"\$?(\d+\.\d{2})")
+TRAILING_PRICE = re.compile(r"[\s:=~-]*[\$₹€]?\s?\d{1,3}(?:[.,]\d{1,7})?\s*$")
+# Quantities with units (500ml, 3 pcs) and decoration
+UNITS_AND_DECORATION = re.compile(rf"\b\d+\s*(?:{UNITS})\b|[-=~*]+", re.IGNORECASE)
+VOCABULARY = re.compile(r"Tax|Total|Payment Method", re.IGNORECASE)
+# Times (15:27, 2:45 pm) and street suffixes
+TIMES_AND_STREETS = re.compile(
+    r"\b(?:\d{1,2}:\d{2}(?:\s*[ap]m)?|st|rd|road|ave|avenue|blvd|street)\b",
+    re.IGNORECASE,
+)
+# Tax lines name the tax and then give an amount or rate, with nothing but
+# punctuation in between ("Taxes and Fees 4.20" aside); "Tax-free Water" and
+# "GST Reg No" are not tax lines
+TAX_AMOUNT = r"(?:\s*(?:and|&)\s*fees)?(?=[^a-z]*[\d%])"
+KIND = re.compile(
+    r"(?P<subtotal>\bsub[\s-]*total\b)"
+    r"|(?P<total>\b(?:grand\s+)?total\b(?!\s+(?:savings|items|discount))"
+    r"|\b(?:amount|balance)\s+due\b)"
+    rf"|(?P<tax>\b(?:(?:sales\s+)?tax(?:es)?|vat|gst|hst|pst|qst)\b{TAX_AMOUNT})",
+    re.IGNORECASE,
+)
+# A date or time is only the line's kind when it is not a total or tax line:
+# "10/14/2026 18:32 TOTAL 7.15" is a total
+TIMESTAMP = re.compile(
+    r"\b\d{1,4}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]m)?\b",
+    re.IGNORECASE,
+)
+# Every KIND or TIMESTAMP match contains one of these words or separators;
+# lines without any of them (most item lines) skip the searches
+KIND_HINTS = ("total", "due", "tax", "vat", "gst", "hst", "pst", "qst", ":", "/", "-")
+QUANTITY = re.compile(
+    r"\b(\d+(?:\.\d+)?)\s*"
+    r"(kg|g|lbs?|oz|ml|l|gal|pcs|packs?|tablets?|tabs|bottles?|box|rolls?)\b"
+    r"|\b(\d+)\s*[x@]\s",
+    re.IGNORECASE,
+)
+
+
+class ParsedLine(NamedTuple):
+    text: str  # the line, trimmed of whitespace and leading decoration
+    kind: str  # item, total, subtotal, tax, timestamp or other
+    price: Optional[float]
+    description: str  # item text with prices, units and noise removed
+    normalized: str  # what the categorizers see for this item
+    quantity: Optional[float]
+    unit: Optional[str]
+
+
+def clean_line_start(text: str) -> str:
+    """Remove leading decoration characters from a line."""
+    return text.lstrip("=-~*")
+
+
+def strip_price(text: str) -> str:
+    """
+    Clean trailing prices, units, and symbols from item descriptions.
+    Example: 'Pepsi 500ml 45.00' -> 'Pepsi'
+    """
+    # A trailing price ends in a digit; most descriptions don't, so skip the
+    # end-anchored search, which is tried at every position of the line
+    if text.rstrip()[-1:].isdigit():
+        text = TRAILING_PRICE.sub("", text)
+    text = UNITS_AND_DECORATION.sub("", text)
+    text = VOCABULARY.sub("", text)
+    return TIMES_AND_STREETS.sub("", text).strip()
+
+
+def normalize_item_text(text: str) -> str:
+    """Reduce an item description to the form the categorizers see."""
+    return preprocess_line(strip_price(text).lower())
+
+
+def parse_line(line: str) -> Optional[ParsedLine]:
+    """Parse one OCR line; None for blank lines."""
+    text = line.strip()
+    if not text:
+        return None
+    text = clean_line_start(text)
+
+    kind = None
+    lowered = text.lower()
+    if any(hint in lowered for hint in KIND_HINTS):
+        kind_match = KIND.search(text)
+        if kind_match:
+            kind = kind_match.lastgroup
+        elif TIMESTAMP.search(text):
+            kind = "timestamp"
+
+    price_match = PRICE.search(text)
+    if not price_match:
+        return ParsedLine(text, kind or "other", None, "", "", None, None)
+
+    price = float(price_match.group(1))
+    if kind == "tax":
+        # The amount is the last figure that isn't a rate ("TAX 8.25% 0.66")
+        amounts = [
+            match.group(1)
+            for match in PRICE.finditer(text)
+            if not text[match.end() :].lstrip().startswith("%")
+        ]
+        if amounts:
+            price = float(amounts[-1])
+    head = text[: price_match.start()]
+    description = strip_price(head.strip())
+    normalized = ""
+    quantity = unit = None
+    if description and price > 0:
+        normalized = normalize_item_text(description)
+        quantity_match = QUANTITY.search(head)
+        if quantity_match:
+            if quantity_match.group(3):
+                quantity = float(quantity_match.group(3))
+            else:
+                quantity = float(quantity_match.group(1))
+                unit = quantity_match.group(2).lower()
+    return ParsedLine(
+        text, kind or "item", price, description, normalized, quantity, unit
+    )
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database import Base, engine
 from routers import (
     auth_routes,
     income_routes,
@@ -12,10 +11,19 @@ from routers import (
 )
 from dependencies import get_current_user
 from schemas import UserResponse
+from config import RUN_MIGRATIONS_ON_STARTUP, OCR_JOB_WORKER_IN_API, ONLINE_MODEL
+from migrate import upgrade_database
+import model_registry
+from database import SessionLocal, engine, async_engine
+from engine_metrics import pool_stats
+from metrics import db_metrics
+from merchants import merchant_index
+from online_model import online_model
+from ocr_pool import ocr_pool
+from ocr_jobs import ocr_job_worker
+from ollama_client import ollama_client
 import os
 
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(debug=True)
 
 origins = ["http://localhost:5174", "http://localhost:5173"]
@@ -27,8 +35,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+
+@app.on_event("startup")
+def run_migrations():
+    if RUN_MIGRATIONS_ON_STARTUP:
+        upgrade_database()
+
+
+@app.on_event("startup")
+def load_receipt_model():
+    # Load the categorizer artifact up front so the first OCR request doesn't pay for it
+    model_registry.load()
+
+
+@app.on_event("startup")
+def load_merchant_index():
+    merchant_index.refresh_if_stale(SessionLocal)
+
+
+@app.on_event("startup")
+def load_online_model():
+    if ONLINE_MODEL:
+        online_model.refresh_if_stale(SessionLocal)
+
+
+@app.on_event("startup")
+def start_ocr_pool():
+    ocr_pool.start()
+
+
+@app.on_event("startup")
+async def start_ocr_job_worker():
+    if OCR_JOB_WORKER_IN_API:
+        ocr_job_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_ocr_job_worker():
+    await ocr_job_worker.stop()
+
+
+@app.on_event("shutdown")
+def stop_ocr_pool():
+    ocr_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    await ollama_client.close()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
 # Mount the static directory for serving profile images # ADDED
 current_dir = os.path.dirname(os.path.abspath(__file__))
 static_dir = os.path.join(current_dir, "static")
@@ -48,3 +112,15 @@ app.include_router(ocr_routes.router, prefix="/api/v1")
 @app.get("/api/v1/me", response_model=UserResponse)
 def read_users_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
+
+
+@app.get("/api/v1/db/metrics")
+def get_db_metrics(current_user: UserResponse = Depends(get_current_user)):
+    """
+    Pool occupancy per engine, and statement latency per SQL verb and pool
+    checkout wait (see engine_metrics.py).
+    """
+    pools = {"sync": pool_stats(engine)}
+    if async_engine is not None:
+        pools["async"] = pool_stats(async_engine.sync_engine)
+    return {"pools": pools, "timings": db_metrics.snapshot()}
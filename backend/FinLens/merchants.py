@@ -0,0 +1,311 @@
+"""
+Merchant-to-category index.
+
+Many receipts are categorized by where they were printed: every item from a
+pharmacy is Health, every item from a gas station Transportation. The index
+maps normalized merchant names to category counts, from a seed list shared by
+everyone and from the expenses each user saved with a merchant, which only
+count for that user. A receipt whose merchant matches an entry with high
+enough confidence is categorized as a whole.
+
+Scan results are cached for every user, so the seed list alone is applied
+while scanning (sparing the model and Ollama); each user's history is
+applied to the result as it is returned (`apply_history`), like overrides.
+
+Lookup is an exact match on the normalized name, then on its longest token
+prefix, then a fuzzy match of the whole name against the indexed names
+sharing the most trigrams with it, which absorbs OCR misreads ("starbueks"
+-> "starbucks"). A prefix match is only trusted when the rest of the name
+says where or what kind of outlet it is ("shell oil 57442", "cvs main st"):
+"uber eats" or "shell seafood grill" is another business, and matches with
+too little confidence to decide the category.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, NamedTuple, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import MERCHANT_MATCH_CONFIDENCE, MERCHANT_INDEX_REFRESH
+from models import Expense
+
+logger = logging.getLogger(__name__)
+
+# Weight of a seed entry, in saved expenses
+SEED_WEIGHT = 20
+# Pseudo-count added to a merchant's total, so a single saved expense doesn't
+# make its category certain
+CATEGORY_PRIOR = 1
+# Similarity credited to a token-prefix match ("shell oil" for "shell"), and to
+# one whose remaining tokens aren't OUTLET_TOKENS; the latter is below any
+# sensible MERCHANT_MATCH_CONFIDENCE
+PREFIX_SIMILARITY = 0.95
+UNTRUSTED_PREFIX_SIMILARITY = 0.6
+MIN_FUZZY_SIMILARITY = 0.85
+FUZZY_CANDIDATES = 5
+
+SEED_MERCHANTS = {
+    "cvs pharmacy": "Health",
+    "cvs": "Health",
+    "walgreens": "Health",
+    "rite aid": "Health",
+    "duane reade": "Health",
+    "boots": "Health",
+    "shell": "Transportation",
+    "chevron": "Transportation",
+    "exxon": "Transportation",
+    "exxonmobil": "Transportation",
+    "mobil": "Transportation",
+    "bp": "Transportation",
+    "texaco": "Transportation",
+    "sunoco": "Transportation",
+    "valero": "Transportation",
+    "citgo": "Transportation",
+    "arco": "Transportation",
+    "uber": "Transportation",
+    "lyft": "Transportation",
+    "starbucks": "Food",
+    "mcdonalds": "Food",
+    "burger king": "Food",
+    "subway": "Food",
+    "chipotle": "Food",
+    "dunkin": "Food",
+    "kfc": "Food",
+    "pizza hut": "Food",
+    "dominos": "Food",
+    "taco bell": "Food",
+    "whole foods market": "Groceries",
+    "whole foods": "Groceries",
+    "trader joes": "Groceries",
+    "kroger": "Groceries",
+    "safeway": "Groceries",
+    "aldi": "Groceries",
+    "lidl": "Groceries",
+    "publix": "Groceries",
+    "wegmans": "Groceries",
+    "sprouts farmers market": "Groceries",
+    "amc theatres": "Entertainment",
+    "regal cinemas": "Entertainment",
+    "cinemark": "Entertainment",
+    "ulta beauty": "Personal Care",
+    "sephora": "Personal Care",
+    "great clips": "Personal Care",
+    "best buy": "Shopping",
+    "ikea": "Shopping",
+    "h and m": "Shopping",
+    "zara": "Shopping",
+    "uniqlo": "Shopping",
+}
+
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Store numbers and legal suffixes say nothing about the merchant
+NOISE_TOKENS = {"inc", "llc", "ltd", "co", "corp", "the", "store", "no"}
+# Words after a merchant's name that describe the outlet or its location
+# rather than naming a different business
+OUTLET_TOKENS = {
+    "oil", "gas", "fuel", "station", "pharmacy", "drugstore", "market",
+    "supermarket", "supercenter", "coffee", "cafe", "restaurant", "express",
+    "st", "street", "ave", "avenue", "rd", "road", "blvd", "dr", "hwy", "main",
+    "north", "south", "east", "west", "downtown", "airport", "mall", "plaza",
+}
+
+
+class MerchantMatch(NamedTuple):
+    merchant: str  # the indexed name that matched
+    category: str
+    similarity: float
+    confidence: float  # similarity times the category's share for the merchant
+
+
+def normalize_merchant(name: str) -> str:
+    """'CVS/pharmacy #08371' -> 'cvs pharmacy'; 'Trader Joe's' -> 'trader joes'."""
+    name = name.lower().replace("&", " and ").replace("'", "").replace("’", "")
+    tokens = [
+        token
+        for token in NON_ALNUM.sub(" ", name).split()
+        if token not in NOISE_TOKENS and not token.isdigit()
+    ]
+    return " ".join(tokens)
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class _Names:
+    """Category counts per normalized merchant name, with a trigram index."""
+
+    def __init__(self):
+        self.counts: Dict[str, Counter] = {}
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+
+    def add(self, name: str, category: str, weight: int) -> None:
+        if not name:
+            return
+        counts = self.counts.get(name)
+        if counts is None:
+            counts = self.counts[name] = Counter()
+            for gram in trigrams(name):
+                self.grams[gram].add(name)
+        counts[category] += weight
+
+
+class MerchantIndex:
+    def __init__(self, seed: Optional[Dict[str, str]] = None):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._seed = _Names()
+        self._history: Dict[int, _Names] = {}  # by user id
+        self._refreshed_at = float("-inf")
+        for merchant, category in (seed if seed is not None else SEED_MERCHANTS).items():
+            self._seed.add(normalize_merchant(merchant), category, SEED_WEIGHT)
+
+    def add(self, merchant: str, category: str, user_id: int, weight: int = 1) -> None:
+        """Record that the user saved an expense at `merchant` as `category`."""
+        with self._lock:
+            history = self._history.get(user_id)
+            if history is None:
+                history = self._history[user_id] = _Names()
+            history.add(normalize_merchant(merchant), category, weight)
+
+    def __len__(self) -> int:
+        return len(self._seed.counts) + sum(
+            len(history.counts) for history in self._history.values()
+        )
+
+    def lookup(
+        self, merchant: str, user_id: Optional[int] = None
+    ) -> Optional[MerchantMatch]:
+        """Match against the seed list plus, given a user, that user's history."""
+        name = normalize_merchant(merchant)
+        if not name:
+            return None
+        with self._lock:
+            tables = [self._seed]
+            if user_id in self._history:
+                tables.append(self._history[user_id])
+            matched, similarity = self._find(name, tables)
+            if matched is None:
+                return None
+            counts = Counter()
+            for table in tables:
+                counts.update(table.counts.get(matched, {}))
+            category, top = counts.most_common(1)[0]
+            share = top / (sum(counts.values()) + CATEGORY_PRIOR)
+        return MerchantMatch(matched, category, similarity, similarity * share)
+
+    @staticmethod
+    def _find(name: str, tables):
+        if any(name in table.counts for table in tables):
+            return name, 1.0
+
+        tokens = name.split()
+        for end in range(len(tokens) - 1, 0, -1):
+            prefix = " ".join(tokens[:end])
+            if any(prefix in table.counts for table in tables):
+                if OUTLET_TOKENS.issuperset(tokens[end:]):
+                    return prefix, PREFIX_SIMILARITY
+                return prefix, UNTRUSTED_PREFIX_SIMILARITY
+
+        # Candidates share the most trigrams with the name; the best of them by
+        # edit similarity wins. Only whole names are matched fuzzily: a fuzzy
+        # prefix ("mobile phone shop" -> "mobil") is too often another business.
+        shared = Counter()
+        for gram in trigrams(name):
+            shared.update(set().union(*(table.grams.get(gram, ()) for table in tables)))
+        best, best_similarity = None, MIN_FUZZY_SIMILARITY
+        for candidate, _ in shared.most_common(FUZZY_CANDIDATES):
+            similarity = SequenceMatcher(None, name, candidate).ratio()
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best, best_similarity
+
+    def categorize(
+        self,
+        merchant: str,
+        user_id: Optional[int] = None,
+        min_confidence: float = MERCHANT_MATCH_CONFIDENCE,
+    ) -> Optional[MerchantMatch]:
+        """The match for `merchant` if it is confident enough to trust."""
+        match = self.lookup(merchant, user_id)
+        if match is not None and match.confidence >= min_confidence:
+            return match
+        return None
+
+    def apply_history(self, result: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """
+        A copy of an OCRResponse-shaped result with every item in the category
+        the user's history (and the seed list) gives its merchant, or `result`
+        itself when there is no confident match. `result` may be shared
+        through the OCR cache and is not modified.
+        """
+        match = self.categorize(result["merchant"], user_id)
+        if match is None:
+            return result
+        items = [
+            {**item, "category": match.category, "confidence": match.confidence}
+            for item in result["line_items"]
+        ]
+        categorized = {}
+        if items:
+            categorized[match.category] = sum(item["amount"] for item in items)
+        return {
+            **result,
+            "line_items": items,
+            "categorized": categorized,
+            "merchant_category": match.category,
+        }
+
+    def load_history(self, db: Session) -> None:
+        """Replace the users' history with the expenses they saved with a merchant."""
+        rows = (
+            db.query(Expense.user_id, Expense.merchant, Expense.category, func.count())
+            .filter(Expense.merchant.isnot(None))
+            .group_by(Expense.user_id, Expense.merchant, Expense.category)
+            .all()
+        )
+        history: Dict[int, _Names] = defaultdict(_Names)
+        for user_id, merchant, category, count in rows:
+            history[user_id].add(normalize_merchant(merchant), category, count)
+        with self._lock:
+            self._history = dict(history)
+        merchants = sum(len(names.counts) for names in history.values())
+        logger.info(
+            f"Merchant history loaded: {merchants} merchants of {len(history)} users"
+        )
+
+    def refresh_if_stale(self, db_factory, max_age: float = MERCHANT_INDEX_REFRESH):
+        """
+        Reload history when it is older than `max_age` seconds, picking up
+        expenses saved by other workers. One caller reloads; the others keep
+        using the current history instead of each running the query.
+        """
+        if time.monotonic() - self._refreshed_at < max_age:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._refreshed_at < max_age:
+                return
+            # Stamped before loading, so a slow or failing load isn't retried
+            # by every request until it finishes
+            self._refreshed_at = time.monotonic()
+            db = db_factory()
+            try:
+                self.load_history(db)
+            except Exception as e:
+                # Keep serving the current index; try again after the next interval
+                logger.error(f"Could not load merchant history: {e!r}")
+            finally:
+                db.close()
+        finally:
+            self._refresh_lock.release()
+
+
+merchant_index = MerchantIndex()
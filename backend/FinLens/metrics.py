@@ -0,0 +1,65 @@
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+
+class StageMetrics:
+    """
+    In-process timing recorder. Keeps a bounded window of recent samples per
+    stage so percentiles reflect current load rather than the whole uptime.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+        self._counts: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+
+    def record_many(self, timings: Dict[str, float]) -> None:
+        for stage, seconds in timings.items():
+            self.record(stage, seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for stage, values in samples.items():
+            if not values:
+                continue
+            summary[stage] = {
+                "count": counts[stage],
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": _percentile(values, 0.50) * 1000,
+                "p95_ms": _percentile(values, 0.95) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return summary
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header value (durations in ms)."""
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+    )
+
+
+ocr_metrics = StageMetrics()
+db_metrics = StageMetrics()
@@ -0,0 +1,68 @@
+import os
+from typing import List
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from config import BASE_DIR
+from database import engine
+
+INITIAL_REVISION = "0001"
+# Tables and columns of the initial revision. A database without alembic_version
+# is only stamped at that revision when it has all of them.
+INITIAL_SCHEMA = {
+    "users": {
+        "id", "full_name", "email", "password_hash", "profile_image", "created_at"
+    },
+    "income": {"id", "user_id", "source", "icon", "amount", "date"},
+    "expense": {"id", "user_id", "category", "icon", "amount", "date"},
+    "budget": {
+        "id", "user_id", "category", "icon", "amount", "created_at", "updated_at"
+    },
+}
+
+
+def alembic_config() -> Config:
+    cfg = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def missing_initial_schema(inspector) -> List[str]:
+    """Tables and table.columns of the initial revision the database lacks."""
+    missing = []
+    tables = set(inspector.get_table_names())
+    for table, columns in INITIAL_SCHEMA.items():
+        if table not in tables:
+            missing.append(table)
+            continue
+        present = {column["name"] for column in inspector.get_columns(table)}
+        missing += [f"{table}.{column}" for column in sorted(columns - present)]
+    return missing
+
+
+def upgrade_database(bind=engine, revision: str = "head") -> None:
+    """Bring the database schema up to `revision`."""
+    cfg = alembic_config()
+    with bind.begin() as connection:
+        cfg.attributes["connection"] = connection
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            # Created by the old Base.metadata.create_all or database.txt: adopt
+            # it as the initial revision, if that is what it is
+            missing = missing_initial_schema(inspector)
+            if missing:
+                raise RuntimeError(
+                    f"Database has no alembic_version and is not at revision "
+                    f"{INITIAL_REVISION} (missing {', '.join(missing)}); migrate it "
+                    f"by hand and stamp it, or recreate it from database.txt"
+                )
+            command.stamp(cfg, INITIAL_REVISION)
+        command.upgrade(cfg, revision)
+
+
+if __name__ == "__main__":
+    upgrade_database()
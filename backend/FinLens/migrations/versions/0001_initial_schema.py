@@ -0,0 +1,72 @@
+"""initial schema
+
+Matches what Base.metadata.create_all produced before migrations existed;
+databases created that way are stamped at this revision by migrate.py.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("full_name", sa.String(100)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("password_hash", sa.String(255)),
+        sa.Column("profile_image", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "income",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("source", sa.String(100)),
+        sa.Column("icon", sa.String(255), nullable=True),
+        sa.Column("amount", sa.DECIMAL(10, 2)),
+        sa.Column("date", sa.DateTime()),
+    )
+    op.create_index("ix_income_id", "income", ["id"])
+
+    op.create_table(
+        "expense",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("category", sa.String(100)),
+        sa.Column("icon", sa.String(255), nullable=True),
+        sa.Column("amount", sa.DECIMAL(10, 2)),
+        sa.Column("date", sa.DateTime()),
+    )
+    op.create_index("ix_expense_id", "expense", ["id"])
+
+    op.create_table(
+        "budget",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("category", sa.String(100)),
+        sa.Column("icon", sa.String(255), nullable=True),
+        sa.Column("amount", sa.DECIMAL(10, 2)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_budget_id", "budget", ["id"])
+
+
+def downgrade():
+    op.drop_table("budget")
+    op.drop_table("expense")
+    op.drop_table("income")
+    op.drop_table("users")
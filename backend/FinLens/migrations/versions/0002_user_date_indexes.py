@@ -0,0 +1,32 @@
+"""composite indexes for per-user date and category queries
+
+Every dashboard, budget and list query filters on user_id and then ranges
+or orders by date, or filters by category.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_income_user_id_date", "income", ["user_id", "date"])
+    op.create_index("ix_expense_user_id_date", "expense", ["user_id", "date"])
+    op.create_index(
+        "ix_expense_user_id_category_date", "expense", ["user_id", "category", "date"]
+    )
+    op.create_index("ix_budget_user_id_category", "budget", ["user_id", "category"])
+
+
+def downgrade():
+    op.drop_index("ix_budget_user_id_category", table_name="budget")
+    op.drop_index("ix_expense_user_id_category_date", table_name="expense")
+    op.drop_index("ix_expense_user_id_date", table_name="expense")
+    op.drop_index("ix_income_user_id_date", table_name="income")
@@ -0,0 +1,83 @@
+"""monthly per-category rollup of income and expense
+
+Creates monthly_rollup and backfills it from the existing rows.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from collections import defaultdict
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table(
+        "monthly_rollup",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("kind", sa.String(10), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("total", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "kind", "month", "category"),
+    )
+
+    conn = op.get_bind()
+    rows = []
+    for kind, table_name, label in (
+        ("income", "income", "source"),
+        ("expense", "expense", "category"),
+    ):
+        table = sa.table(
+            table_name,
+            sa.column("user_id"),
+            sa.column(label),
+            sa.column("amount"),
+            sa.column("date"),
+        )
+        year = sa.extract("year", table.c.date)
+        month = sa.extract("month", table.c.date)
+        totals = defaultdict(lambda: [0, 0])
+        result = conn.execute(
+            sa.select(
+                table.c.user_id,
+                table.c[label],
+                year,
+                month,
+                sa.func.sum(table.c.amount),
+                sa.func.count(),
+            )
+            .where(table.c.date.isnot(None), table.c[label].isnot(None))
+            .group_by(table.c.user_id, table.c[label], year, month)
+        )
+        for user_id, category, y, m, total, count in result:
+            key = (user_id, category, date(int(y), int(m), 1))
+            totals[key][0] += total
+            totals[key][1] += count
+        rows.extend(
+            {
+                "user_id": user_id,
+                "month": month_start,
+                "kind": kind,
+                "category": category,
+                "total": total,
+                "count": count,
+            }
+            for (user_id, category, month_start), (total, count) in totals.items()
+        )
+
+    if rows:
+        op.bulk_insert(rollup, rows)
+
+
+def downgrade():
+    op.drop_table("monthly_rollup")
@@ -0,0 +1,49 @@
+"""queued OCR jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import LONGBLOB
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ocr_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column(
+            "image", sa.LargeBinary().with_variant(LONGBLOB(), "mysql"), nullable=True
+        ),
+        sa.Column("filename", sa.String(255), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("worker_id", sa.String(64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_ocr_jobs_status_available_at", "ocr_jobs", ["status", "available_at"]
+    )
+    op.create_index(
+        "ix_ocr_jobs_user_id_created_at", "ocr_jobs", ["user_id", "created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_ocr_jobs_user_id_created_at", table_name="ocr_jobs")
+    op.drop_index("ix_ocr_jobs_status_available_at", table_name="ocr_jobs")
+    op.drop_table("ocr_jobs")
@@ -0,0 +1,25 @@
+"""merchant on expenses
+
+Expenses saved from a scanned receipt record the merchant, which feeds the
+merchant-to-category index used to categorize later receipts.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("expense", sa.Column("merchant", sa.String(100), nullable=True))
+
+
+def downgrade():
+    op.drop_column("expense", "merchant")
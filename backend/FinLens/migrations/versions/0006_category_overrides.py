@@ -0,0 +1,33 @@
+"""per-user category overrides
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "category_overrides",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("text", sa.String(255), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "text"),
+    )
+    op.create_index(
+        "ix_category_overrides_updated_at", "category_overrides", ["updated_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_category_overrides_updated_at", table_name="category_overrides")
+    op.drop_table("category_overrides")
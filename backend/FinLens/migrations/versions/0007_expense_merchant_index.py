@@ -0,0 +1,27 @@
+"""index for loading merchant history
+
+The merchant index groups every expense saved with a merchant by user,
+merchant and category. Most expenses have none; leading with merchant lets
+the query skip them and read the groups from the index alone.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_expense_merchant", "expense", ["merchant", "user_id", "category"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_expense_merchant", table_name="expense")
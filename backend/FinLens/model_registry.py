@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import joblib
+
+from config import MODEL_DIR, MODEL_MANIFEST, CATEGORIZER_ENGINE
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = "receipt_categorizer"
+ENGINES = ("pipeline", "hashing")
+
+
+class ModelArtifactError(RuntimeError):
+    """Raised when the categorizer artifact is missing or fails verification."""
+
+
+_lock = threading.Lock()
+_loaded: Optional[Dict[str, Any]] = None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_name(engine: str = CATEGORIZER_ENGINE) -> str:
+    return ARTIFACT_NAME if engine == "pipeline" else f"{ARTIFACT_NAME}_{engine}"
+
+
+def manifest_name(engine: str = CATEGORIZER_ENGINE) -> str:
+    """Each engine has its own manifest, so switching engines is a config change."""
+    if MODEL_MANIFEST:
+        return MODEL_MANIFEST
+    return "manifest.json" if engine == "pipeline" else f"manifest-{engine}.json"
+
+
+def read_manifest(
+    model_dir: str = MODEL_DIR, engine: str = CATEGORIZER_ENGINE
+) -> Dict[str, Any]:
+    manifest_path = os.path.join(model_dir, manifest_name(engine))
+    try:
+        with open(manifest_path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        raise ModelArtifactError(
+            f"No model manifest at {manifest_path}; run `python train_model.py train`"
+        )
+
+
+def _atomic_write(path: str, write) -> None:
+    """Write through a temp file in the same directory and rename it into place,
+    so concurrent readers never see a half-written file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def publish(
+    model,
+    metadata: Dict[str, Any],
+    model_dir: str = MODEL_DIR,
+    engine: str = CATEGORIZER_ENGINE,
+) -> Dict[str, Any]:
+    """
+    Save a trained model as a versioned artifact and point the manifest at it.
+    The version is derived from the artifact checksum, so retraining with the
+    same seed and data produces the same version.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    name = artifact_name(engine)
+    staging_path = os.path.join(model_dir, f".{name}.{os.getpid()}.staging")
+    # Uncompressed so numpy arrays inside the pipeline can be memory-mapped on load
+    joblib.dump(model, staging_path)
+    sha256 = file_sha256(staging_path)
+    version = sha256[:12]
+    filename = f"{name}-{version}.joblib"
+    size_bytes = os.path.getsize(staging_path)
+    os.replace(staging_path, os.path.join(model_dir, filename))
+
+    manifest = {
+        "name": name,
+        "engine": engine,
+        "version": version,
+        "file": filename,
+        "sha256": sha256,
+        "size_bytes": size_bytes,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        **metadata,
+    }
+
+    def write_manifest(path):
+        with open(path, "w") as fh:
+            json.dump(manifest, fh, indent=2)
+            fh.write("\n")
+
+    _atomic_write(os.path.join(model_dir, manifest_name(engine)), write_manifest)
+    return manifest
+
+
+def load_artifact(model_dir: str, manifest: Dict[str, Any]):
+    """Verify the artifact a manifest points at against its checksum and load it."""
+    artifact_path = os.path.join(model_dir, manifest["file"])
+    if not os.path.exists(artifact_path):
+        raise ModelArtifactError(f"Model artifact {artifact_path} is missing")
+
+    checksum = file_sha256(artifact_path)
+    if checksum != manifest["sha256"]:
+        raise ModelArtifactError(
+            f"Checksum mismatch for {manifest['file']}: "
+            f"expected {manifest['sha256']}, got {checksum}"
+        )
+
+    trained_with = manifest.get("sklearn_version")
+    if trained_with:
+        import sklearn
+
+        if sklearn.__version__ != trained_with:
+            logger.warning(
+                f"Model {manifest['version']} was trained with scikit-learn "
+                f"{trained_with}, running {sklearn.__version__}"
+            )
+
+    model = joblib.load(artifact_path, mmap_mode="r")
+    logger.info(f"Loaded receipt categorizer {manifest['version']} from {artifact_path}")
+    return model
+
+
+def _load(model_dir: str) -> Dict[str, Any]:
+    manifest = read_manifest(model_dir)
+    return {"model": load_artifact(model_dir, manifest), "manifest": manifest}
+
+
+def load(model_dir: str = MODEL_DIR) -> Dict[str, Any]:
+    """Load the current artifact once per process and return it with its manifest."""
+    global _loaded
+    if _loaded is None:
+        with _lock:
+            if _loaded is None:
+                _loaded = _load(model_dir)
+    return _loaded
+
+
+def get_model():
+    return load()["model"]
+
+
+def get_version() -> str:
+    return load()["manifest"]["version"]
@@ -1,4 +1,17 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, ForeignKey, DateTime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DECIMAL,
+    ForeignKey,
+    Date,
+    DateTime,
+    Index,
+    LargeBinary,
+    PrimaryKeyConstraint,
+    Text,
+)
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -16,6 +29,9 @@ class User(Base):
     income = relationship("Income", back_populates="owner", cascade="all, delete")
     expense = relationship("Expense", back_populates="owner", cascade="all, delete")
     budget = relationship("Budget", back_populates="owner", cascade="all, delete")
+    rollup = relationship(
+        "MonthlyRollup", back_populates="owner", cascade="all, delete"
+    )
 
 
 class Income(Base):
@@ -29,6 +45,8 @@ class Income(Base):
 
     owner = relationship("User", back_populates="income")
 
+    __table_args__ = (Index("ix_income_user_id_date", "user_id", "date"),)
+
 
 class Expense(Base):
     __tablename__ = "expense"
@@ -38,9 +56,16 @@ class Expense(Base):
     icon = Column(String(255), nullable=True)
     amount = Column(DECIMAL(10, 2))
     date = Column(DateTime)
+    merchant = Column(String(100), nullable=True)
 
     owner = relationship("User", back_populates="expense")
 
+    __table_args__ = (
+        Index("ix_expense_user_id_date", "user_id", "date"),
+        Index("ix_expense_user_id_category_date", "user_id", "category", "date"),
+        Index("ix_expense_merchant", "merchant", "user_id", "category"),
+    )
+
 
 class Budget(Base):
     __tablename__ = "budget"
@@ -53,3 +78,70 @@ class Budget(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="budget")
+
+    __table_args__ = (Index("ix_budget_user_id_category", "user_id", "category"),)
+
+
+class MonthlyRollup(Base):
+    """
+    Per-user monthly totals by category, kept in step with income and expense
+    writes (see rollup.py). For income rows, `category` holds the source.
+    """
+
+    __tablename__ = "monthly_rollup"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month
+    kind = Column(String(10), nullable=False)  # "income" or "expense"
+    category = Column(String(100), nullable=False)
+    total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    owner = relationship("User", back_populates="rollup")
+
+    __table_args__ = (PrimaryKeyConstraint("user_id", "kind", "month", "category"),)
+
+
+class OCRJob(Base):
+    """
+    A queued receipt scan (see ocr_jobs.py). The upload is kept in the row so
+    any worker process can pick the job up, and dropped once the job finishes.
+    """
+
+    __tablename__ = "ocr_jobs"
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(10), nullable=False)  # queued, running, done, failed
+    image = Column(LargeBinary().with_variant(LONGBLOB(), "mysql"), nullable=True)
+    filename = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(Text, nullable=True)  # OCRResponse as JSON
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ocr_jobs_status_available_at", "status", "available_at"),
+        Index("ix_ocr_jobs_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class CategoryOverride(Base):
+    """
+    A user's correction of a scanned item's category, keyed by the item's
+    normalized text (see overrides.py).
+    """
+
+    __tablename__ = "category_overrides"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    text = Column(String(255), nullable=False)  # line_parser.normalize_item_text
+    category = Column(String(100), nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "text"),
+        Index("ix_category_overrides_updated_at", "updated_at"),
+    )
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import pytesseract
+
+import model_registry
+from cache import TTLCache
+from config import (
+    OCR_CACHE_SIZE,
+    OCR_CACHE_DIR,
+    OCR_CACHE_DISK_BYTES,
+    USE_OLLAMA,
+    OLLAMA_MODEL,
+    ONLINE_MODEL,
+)
+from image_preprocess import settings_signature
+from ocr_pool import OCR_PIPELINE_VERSION
+from online_model import online_model
+
+logger = logging.getLogger(__name__)
+
+_tesseract_version: Optional[str] = None
+
+
+def tesseract_version() -> str:
+    """Installed Tesseract version, looked up once per process."""
+    global _tesseract_version
+    if _tesseract_version is None:
+        try:
+            _tesseract_version = str(pytesseract.get_tesseract_version())
+        except Exception as e:
+            logger.warning(f"Could not determine Tesseract version: {e!r}")
+            _tesseract_version = "unknown"
+    return _tesseract_version
+
+
+def result_version() -> str:
+    """
+    Everything besides the image that determines a scan result. Changing any
+    part (Tesseract upgrade, OCR pipeline or preprocessing settings, new
+    categorizer artifact or online model update, Ollama on/off) changes every
+    key, so stale results are never served. Users' merchant history and
+    overrides are not part of it: they are applied after the cache
+    (receipts.personalize).
+    """
+    fallback = OLLAMA_MODEL if USE_OLLAMA else "none"
+    model = online_model.version() if ONLINE_MODEL else model_registry.get_version()
+    return (
+        f"tesseract={tesseract_version()};pipeline={OCR_PIPELINE_VERSION};"
+        f"preprocess={settings_signature()};"
+        f"model={model};fallback={fallback}"
+    )
+
+
+class OCRResultCache:
+    """
+    Content-addressed cache of scan results. Lookups hit an in-memory LRU
+    first, then the optional disk tier, where files are evicted oldest-used
+    first once their total size passes `disk_max_bytes`.
+
+    Disk access blocks, so call `get`/`set` from a thread pool.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = OCR_CACHE_SIZE,
+        disk_dir: str = OCR_CACHE_DIR,
+        disk_max_bytes: int = OCR_CACHE_DISK_BYTES,
+    ):
+        self.memory = TTLCache(maxsize)
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.disk_hits = 0
+
+    def key(self, contents: bytes, part: str = "") -> str:
+        """Key for `contents`; `part` picks out a piece of it, e.g. a PDF page."""
+        digest = hashlib.sha256(contents)
+        digest.update(b"\0" + part.encode() + b"\0" + result_version().encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _scan_disk(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    total += os.path.getsize(os.path.join(root, name))
+        return total
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.memory.get(key)
+        if result is not None or self.disk_dir is None:
+            return result
+
+        path = self._path(key)
+        try:
+            with open(path) as fh:
+                result = json.load(fh)
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, result)
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        self.memory.set(key, result)
+        if self.disk_dir is None:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(result, fh)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key}: {e!r}")
+            return
+
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used files until the tier is at 90% of its cap."""
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        if self.disk_dir is not None:
+            stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+
+ocr_cache = OCRResultCache()
@@ -0,0 +1,361 @@
+"""
+Persistent queue of receipt scans.
+
+POST /ocr/jobs stores the upload in the ocr_jobs table and returns at once;
+workers claim queued jobs, run them through receipts.scan and store the
+result for GET /ocr/jobs/{id}. Workers run inside the API process
+(OCR_JOB_WORKER_IN_API) and/or as separate processes that scale
+independently of the API:
+
+    python ocr_jobs.py worker [--concurrency N]
+
+Claiming is a conditional UPDATE on the job's attempt count, so any number of
+workers can share the table without row locks. A running job whose lease
+expires (its worker died) is claimed again; every claim counts as an attempt,
+and a job fails for good after OCR_JOB_MAX_ATTEMPTS.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, defer
+
+import model_registry
+import receipts
+from config import (
+    OCR_JOB_CONCURRENCY,
+    OCR_JOB_TIMEOUT,
+    OCR_JOB_MAX_ATTEMPTS,
+    OCR_JOB_POLL_INTERVAL,
+)
+from database import SessionLocal
+from models import OCRJob
+from ocr_pool import ocr_pool, OCRPoolSaturated
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Extra time past the job timeout before another worker may take a job over
+LEASE_GRACE_SECONDS = 30
+RETRY_BACKOFF_SECONDS = 5
+
+
+def create_job(db: Session, user_id: int, contents: bytes, filename: str) -> OCRJob:
+    now = datetime.utcnow()
+    job = OCRJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status=QUEUED,
+        image=contents,
+        filename=filename,
+        attempts=0,
+        created_at=now,
+        available_at=now,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def get_job(db: Session, job_id: str, user_id: int) -> Optional[OCRJob]:
+    return (
+        db.query(OCRJob)
+        .options(defer(OCRJob.image))
+        .filter(OCRJob.id == job_id, OCRJob.user_id == user_id)
+        .first()
+    )
+
+
+def job_response(job: OCRJob) -> Dict[str, Any]:
+    """OCRJobResponse fields for `job`."""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+    }
+
+
+def claim_next(
+    db: Session,
+    worker_id: str,
+    lease_seconds: float,
+    max_attempts: int = OCR_JOB_MAX_ATTEMPTS,
+) -> Optional[Tuple[str, int, bytes]]:
+    """
+    Claim the oldest runnable job: queued and due, or running with an expired
+    lease. Returns (job id, attempt number, upload) or None if there is
+    nothing to do or another worker won the race.
+    """
+    now = datetime.utcnow()
+    candidate = (
+        db.query(OCRJob.id, OCRJob.status, OCRJob.attempts)
+        .filter(
+            or_(
+                and_(OCRJob.status == QUEUED, OCRJob.available_at <= now),
+                and_(OCRJob.status == RUNNING, OCRJob.lease_expires_at < now),
+            )
+        )
+        .order_by(OCRJob.available_at)
+        .first()
+    )
+    if candidate is None:
+        return None
+
+    if candidate.status == RUNNING and candidate.attempts >= max_attempts:
+        # Its last worker died mid-job and there are no attempts left
+        _update_claimed(
+            db,
+            candidate.id,
+            candidate.attempts,
+            {
+                OCRJob.status: FAILED,
+                OCRJob.error: "Worker stopped before finishing the job",
+                OCRJob.image: None,
+                OCRJob.finished_at: now,
+                OCRJob.lease_expires_at: None,
+            },
+        )
+        return None
+
+    claimed = (
+        db.query(OCRJob)
+        .filter(
+            OCRJob.id == candidate.id,
+            OCRJob.status == candidate.status,
+            OCRJob.attempts == candidate.attempts,
+        )
+        .update(
+            {
+                OCRJob.status: RUNNING,
+                OCRJob.attempts: candidate.attempts + 1,
+                OCRJob.worker_id: worker_id,
+                OCRJob.started_at: now,
+                OCRJob.lease_expires_at: now + timedelta(seconds=lease_seconds),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if claimed != 1:
+        return None
+
+    contents = db.query(OCRJob.image).filter(OCRJob.id == candidate.id).scalar()
+    return candidate.id, candidate.attempts + 1, contents
+
+
+def _update_claimed(db: Session, job_id: str, attempt: int, values: dict) -> bool:
+    """Update a job only while this claim (attempt) still owns it."""
+    updated = (
+        db.query(OCRJob)
+        .filter(
+            OCRJob.id == job_id,
+            OCRJob.status == RUNNING,
+            OCRJob.attempts == attempt,
+        )
+        .update(values, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+
+def complete(db: Session, job_id: str, attempt: int, result: Dict[str, Any]) -> bool:
+    return _update_claimed(
+        db,
+        job_id,
+        attempt,
+        {
+            OCRJob.status: DONE,
+            OCRJob.result: json.dumps(result),
+            OCRJob.error: None,
+            OCRJob.image: None,
+            OCRJob.finished_at: datetime.utcnow(),
+            OCRJob.lease_expires_at: None,
+        },
+    )
+
+
+def fail(
+    db: Session, job_id: str, attempt: int, error: str, max_attempts: int
+) -> bool:
+    """Requeue with exponential backoff, or mark failed once attempts run out."""
+    now = datetime.utcnow()
+    if attempt < max_attempts:
+        values = {
+            OCRJob.status: QUEUED,
+            OCRJob.error: error,
+            OCRJob.available_at: now
+            + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)),
+            OCRJob.lease_expires_at: None,
+        }
+    else:
+        values = {
+            OCRJob.status: FAILED,
+            OCRJob.error: error,
+            OCRJob.image: None,
+            OCRJob.finished_at: now,
+            OCRJob.lease_expires_at: None,
+        }
+    return _update_claimed(db, job_id, attempt, values)
+
+
+def release(db: Session, job_id: str, attempt: int, delay: float = 1.0) -> bool:
+    """Hand a job back without counting the attempt (the OCR pool was full)."""
+    return _update_claimed(
+        db,
+        job_id,
+        attempt,
+        {
+            OCRJob.status: QUEUED,
+            OCRJob.attempts: attempt - 1,
+            OCRJob.available_at: datetime.utcnow() + timedelta(seconds=delay),
+            OCRJob.lease_expires_at: None,
+        },
+    )
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class OCRJobWorker:
+    """
+    Claims jobs from the table and runs up to `concurrency` of them at once
+    on this process's OCR pool, each bounded by `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = OCR_JOB_CONCURRENCY,
+        timeout: float = OCR_JOB_TIMEOUT,
+        max_attempts: int = OCR_JOB_MAX_ATTEMPTS,
+        poll_interval: float = OCR_JOB_POLL_INTERVAL,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._counts = {"done": 0, "retried": 0, "failed": 0, "released": 0}
+
+    def start(self) -> None:
+        """Start polling in the background; needs a running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+            logger.info(f"Started OCR job worker {self.worker_id}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Jobs cut short here keep their lease and are retried once it expires
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def run_forever(self) -> None:
+        lease_seconds = self.timeout + LEASE_GRACE_SECONDS
+        while True:
+            if len(self._running) >= self.concurrency:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                claimed = await run_in_threadpool(
+                    _with_session,
+                    claim_next,
+                    self.worker_id,
+                    lease_seconds,
+                    self.max_attempts,
+                )
+            except Exception as e:
+                logger.error(f"Could not claim OCR job: {e!r}")
+                claimed = None
+            if claimed is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self._process(*claimed))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _process(self, job_id: str, attempt: int, contents: bytes) -> None:
+        try:
+            result, _ = await asyncio.wait_for(receipts.scan(contents), self.timeout)
+        except OCRPoolSaturated:
+            await run_in_threadpool(_with_session, release, job_id, attempt)
+            self._counts["released"] += 1
+            return
+        except asyncio.TimeoutError:
+            error = f"Timed out after {self.timeout:g}s"
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        else:
+            await run_in_threadpool(_with_session, complete, job_id, attempt, result)
+            self._counts["done"] += 1
+            return
+
+        logger.error(f"OCR job {job_id} attempt {attempt} failed: {error}")
+        await run_in_threadpool(
+            _with_session, fail, job_id, attempt, error, self.max_attempts
+        )
+        self._counts["retried" if attempt < self.max_attempts else "failed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            **self._counts,
+        }
+
+
+ocr_job_worker = OCRJobWorker()
+
+
+async def _run_worker(worker: OCRJobWorker) -> None:
+    model_registry.load()
+    ocr_pool.start()
+    try:
+        await worker.run_forever()
+    finally:
+        await worker.stop()
+        ocr_pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCR job queue")
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("--concurrency", type=int, default=OCR_JOB_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_run_worker(OCRJobWorker(concurrency=args.concurrency)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+import pymupdf
+import pytesseract
+from PIL import Image
+
+from config import (
+    OCR_POOL_WORKERS,
+    OCR_POOL_QUEUE_DEPTH,
+    OCR_PREPROCESS,
+    OCR_TARGET_DPI,
+    OCR_TESSERACT_TIMEOUT,
+)
+from image_preprocess import load_image, preprocess, tesseract_config
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever ocr_image or receipt parsing changes in a way that alters scan
+# results, so cached results produced by the old pipeline are no longer served
+OCR_PIPELINE_VERSION = "8"
+
+
+class OCRPoolSaturated(Exception):
+    """All workers are busy and the wait queue is full."""
+
+
+class OCRPoolUnavailable(Exception):
+    """The pool is not running or a worker process died."""
+
+
+def ocr_image(contents: bytes) -> Tuple[str, Dict[str, float]]:
+    """
+    Decode an uploaded image, clean it up (see image_preprocess) and run
+    Tesseract on it. Runs inside a pool worker process; returns the text and
+    per-stage timings.
+    """
+    t0 = time.perf_counter()
+    image, size = load_image(contents)
+    t1 = time.perf_counter()
+    text, timings = _preprocess_and_ocr(image, size)
+    return text, {"decode": t1 - t0, **timings}
+
+
+def ocr_pdf_page(contents: bytes, page_number: int) -> Tuple[str, Dict[str, float]]:
+    """
+    Rasterize one page of a PDF at OCR_TARGET_DPI and OCR it. Runs inside a
+    pool worker process, so each page of a statement can go to its own worker.
+    """
+    t0 = time.perf_counter()
+    with pymupdf.open(stream=contents, filetype="pdf") as document:
+        pixmap = document.load_page(page_number).get_pixmap(
+            dpi=OCR_TARGET_DPI, colorspace=pymupdf.csGRAY
+        )
+    image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+    t1 = time.perf_counter()
+    text, timings = _preprocess_and_ocr(image, None, dpi=OCR_TARGET_DPI)
+    return text, {"rasterize": t1 - t0, **timings}
+
+
+def pdf_page_count(contents: bytes) -> int:
+    with pymupdf.open(stream=contents, filetype="pdf") as document:
+        return document.page_count
+
+
+def _preprocess_and_ocr(
+    image: Image.Image, size: Optional[Tuple[int, int]], dpi: Optional[int] = None
+) -> Tuple[str, Dict[str, float]]:
+    t0 = time.perf_counter()
+    if OCR_PREPROCESS:
+        image = preprocess(image, size)
+        dpi = OCR_TARGET_DPI
+    t1 = time.perf_counter()
+    # On timeout pytesseract kills the tesseract process and raises RuntimeError
+    text = pytesseract.image_to_string(
+        image, config=tesseract_config(dpi=dpi), timeout=OCR_TESSERACT_TIMEOUT
+    )
+    t2 = time.perf_counter()
+    return text, {"preprocess": t1 - t0, "ocr": t2 - t1}
+
+
+class OCRPool:
+    """
+    Process pool for CPU-bound OCR work, with a cap on how many jobs may be
+    in flight (running + waiting) so a burst of uploads fails fast instead of
+    queueing without bound.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.max_in_flight = workers + queue_depth
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        if self._executor is None:
+            # spawn, not fork: the API process has an event loop and threads running
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started OCR pool with {self.workers} workers")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        if self._executor is None:
+            raise OCRPoolUnavailable("OCR pool is not running")
+        # The counter is only touched from the event loop thread, so no lock is needed
+        if self._in_flight >= self.max_in_flight:
+            self._rejected += 1
+            raise OCRPoolSaturated(
+                f"OCR pool is saturated ({self._in_flight} scans in flight)"
+            )
+
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise OCRPoolUnavailable("OCR worker process died")
+
+        # Work stays counted until the worker is done with it, not until the
+        # caller stops waiting: a caller cancelled by a timeout leaves it running
+        self._in_flight += 1
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise OCRPoolUnavailable("OCR worker process died")
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Called from the executor's thread
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            pass  # the loop has closed
+
+    def _decrement(self) -> None:
+        self._in_flight -= 1
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        # Every scan on the broken executor fails at once; only the first
+        # restarts it, or later ones would shut down its replacement
+        if self._executor is executor:
+            logger.error("OCR worker process died; restarting the pool")
+            self.shutdown()
+            self.start()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "rejected": self._rejected,
+        }
+
+
+ocr_pool = OCRPool(OCR_POOL_WORKERS, OCR_POOL_QUEUE_DEPTH)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from cache import TTLCache
+from config import (
+    OLLAMA_URL,
+    OLLAMA_MODEL,
+    OLLAMA_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_CONCURRENCY_PER_RECEIPT,
+    OLLAMA_CACHE_SIZE,
+    OLLAMA_CACHE_TTL,
+)
+from utils import normalize_item_text, valid_categories
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE = """
+Classify the following receipt item into exactly one of these categories:
+
+Food, Groceries, Entertainment, Transportation, Shopping, Utilities, Personal Care, Health, Taxes, Other.
+
+Item: "{text}"
+
+Respond with only one category name, no explanation.
+"""
+
+
+class OllamaClient:
+    """
+    Async fallback categorizer backed by a local Ollama server.
+
+    One pooled HTTP client is shared by all requests in the process, every call
+    has a timeout, and answers are cached by normalized item text so repeated
+    items are only ever sent to the LLM once.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        model: str = OLLAMA_MODEL,
+        timeout: float = OLLAMA_TIMEOUT,
+        max_connections: int = OLLAMA_MAX_CONNECTIONS,
+        concurrency_per_receipt: int = OLLAMA_CONCURRENCY_PER_RECEIPT,
+        cache: Optional[TTLCache] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.concurrency_per_receipt = concurrency_per_receipt
+        self.cache = (
+            cache if cache is not None else TTLCache(OLLAMA_CACHE_SIZE, OLLAMA_CACHE_TTL)
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _generate(self, text: str) -> Optional[str]:
+        """Ask Ollama for a category. Returns None on any failure so it isn't cached."""
+        payload = {
+            "model": self.model,
+            "prompt": PROMPT_TEMPLATE.format(text=text).strip(),
+            "stream": False,
+        }
+        try:
+            response = await self._get_client().post("/api/generate", json=payload)
+            if response.status_code != 200:
+                logger.error(
+                    f"Ollama API error {response.status_code}: {response.text}"
+                )
+                return None
+            raw = response.json().get("response", "").strip()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Exception calling Ollama for '{text}': {e!r}")
+            return None
+
+        logger.info(f"Ollama raw response for '{text}': '{raw}'")
+
+        # Validate and normalize category
+        category = raw.title()
+        if category not in valid_categories:
+            logger.warning(
+                f"Ollama returned invalid category: '{raw}' (normalized: '{category}')"
+            )
+            return "Other"
+        return category
+
+    async def categorize(self, text: str) -> str:
+        return (await self.categorize_many([text]))[0]
+
+    async def categorize_many(self, texts: List[str]) -> List[str]:
+        """
+        Categorize the items of one receipt. Duplicates and cached items are
+        resolved without a request; the rest fan out with at most
+        `concurrency_per_receipt` requests in flight.
+        """
+        keys = [normalize_item_text(text) or text.lower().strip() for text in texts]
+        resolved: Dict[str, str] = {}
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in resolved or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                resolved[key] = cached
+            else:
+                pending[key] = text
+
+        if pending:
+            semaphore = asyncio.Semaphore(self.concurrency_per_receipt)
+
+            async def fetch(key: str, text: str):
+                async with semaphore:
+                    category = await self._generate(text)
+                if category is not None:
+                    self.cache.set(key, category)
+                resolved[key] = category or "Other"
+
+            await asyncio.gather(*(fetch(key, text) for key, text in pending.items()))
+
+        return [resolved[key] for key in keys]
+
+
+ollama_client = OllamaClient()
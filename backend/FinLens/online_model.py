@@ -0,0 +1,232 @@
+"""
+Incrementally trained categorizer.
+
+A HashingVectorizer + MultinomialNB pair needs no fitted vocabulary, so it
+can keep learning with `partial_fit`: it starts from the training dataset
+and then folds in users' category corrections (see overrides.py) every
+ONLINE_MODEL_UPDATE_INTERVAL seconds, without a full retrain.
+
+The model is always the training dataset plus exactly the corrections
+currently in the database. NB's counts don't depend on the order they arrive
+in, so new corrections are simply added. partial_fit cannot unlearn,
+though, so when a user replaces an earlier correction of the same item the
+model is rebuilt from the dataset and the whole table. API workers and OCR
+job workers holding the same corrections therefore hold the same model, and
+`version()` is a digest of those corrections. Used for categorization when
+ONLINE_MODEL is enabled.
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sqlalchemy.orm import Session
+
+from config import (
+    ONLINE_MODEL_UPDATE_INTERVAL,
+    ONLINE_MODEL_CORRECTION_WEIGHT,
+    ONLINE_MODEL_SEED,
+)
+from models import CategoryOverride
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 16
+# Corrections are stamped before their transaction commits, and MySQL DATETIME
+# keeps whole seconds, so one can appear with an updated_at at or just below the
+# watermark. Each update re-reads this far back and skips what it has learned.
+LATE_COMMIT_SECONDS = 60
+
+
+class OnlineCategorizer:
+    def __init__(self, seed: int = ONLINE_MODEL_SEED):
+        self.seed = seed
+        self.vectorizer = HashingVectorizer(
+            n_features=N_FEATURES, alternate_sign=False, norm=None, ngram_range=(1, 2)
+        )
+        self._lock = threading.Lock()
+        self._model: Optional[MultinomialNB] = None
+        self._classes: List[str] = []
+        self._watermark: Optional[datetime] = None
+        # (user_id, text) -> (category, updated_at) of every correction learned
+        self._learned: Dict[Tuple[int, str], Tuple[str, datetime]] = {}
+        self._version = f"online-{seed}-base"
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = float("-inf")
+        self._counts = {"corrections": 0, "skipped": 0, "updates": 0, "rebuilds": 0}
+
+    def _bootstrap(self) -> MultinomialNB:
+        # Imported here: train_model pulls in pandas, which nothing else needs
+        from train_model import build_dataset
+        from utils import valid_categories
+
+        df = build_dataset(self.seed)
+        self._classes = sorted(set(df["category"]) | valid_categories)
+        model = MultinomialNB()
+        model.partial_fit(
+            self.vectorizer.transform(df["item_text"]),
+            df["category"],
+            classes=self._classes,
+        )
+        return model
+
+    def _get_model(self) -> MultinomialNB:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._bootstrap()
+        return self._model
+
+    @property
+    def classes_(self):
+        return self._get_model().classes_
+
+    def predict(self, texts: List[str]) -> List[str]:
+        model = self._get_model()
+        X = self.vectorizer.transform(texts)
+        with self._lock:
+            return list(model.predict(X))
+
+    def predict_proba(self, texts: List[str]):
+        model = self._get_model()
+        X = self.vectorizer.transform(texts)
+        with self._lock:
+            return model.predict_proba(X)
+
+    def _fit(
+        self, model: MultinomialNB, texts: List[str], categories: List[str]
+    ) -> int:
+        known = [
+            (text, category)
+            for text, category in zip(texts, categories)
+            if text and category in self._classes
+        ]
+        self._counts["skipped"] += len(texts) - len(known)
+        if not known:
+            return 0
+        X = self.vectorizer.transform([text for text, _ in known])
+        y = [category for _, category in known]
+        with self._lock:
+            model.partial_fit(X, y, sample_weight=[ONLINE_MODEL_CORRECTION_WEIGHT] * len(y))
+        return len(known)
+
+    def learn(self, texts: List[str], categories: List[str]) -> int:
+        """partial_fit on corrections; categories the model has no class for are skipped."""
+        learned = self._fit(self._get_model(), texts, categories)
+        if learned:
+            self._counts["corrections"] += learned
+            self._counts["updates"] += 1
+        return learned
+
+    def update_from_db(self, db: Session) -> int:
+        """
+        Learn the corrections saved since the last update, or rebuild when one
+        of them replaces a correction already learned or one has been deleted.
+        """
+        query = _corrections(db)
+        if self._watermark is not None:
+            since = self._watermark - timedelta(seconds=LATE_COMMIT_SECONDS)
+            query = query.filter(CategoryOverride.updated_at >= since)
+        rows = [
+            row
+            for row in query.all()
+            if self._learned.get((row.user_id, row.text))
+            != (row.category, row.updated_at)
+        ]
+        # A replaced correction must be unlearned, and so must one deleted
+        # along with its user, which only shows in the row count
+        replaced = any((row.user_id, row.text) in self._learned for row in rows)
+        expected = len(self._learned) + len(rows)
+        if replaced or db.query(CategoryOverride).count() != expected:
+            return self.rebuild(db)
+        if not rows:
+            return 0
+
+        learned = self.learn([row.text for row in rows], [row.category for row in rows])
+        self._remember(rows)
+        return learned
+
+    def rebuild(self, db: Session) -> int:
+        """Start again from the training dataset plus every correction saved."""
+        rows = _corrections(db).all()
+        model = self._bootstrap()
+        learned = self._fit(
+            model, [row.text for row in rows], [row.category for row in rows]
+        )
+        with self._lock:
+            self._model = model
+        self._learned = {}
+        self._remember(rows)
+        self._counts["corrections"] = learned
+        self._counts["rebuilds"] += 1
+        logger.info(f"Online categorizer rebuilt from {len(rows)} corrections")
+        return learned
+
+    def _remember(self, rows) -> None:
+        for row in rows:
+            self._learned[(row.user_id, row.text)] = (row.category, row.updated_at)
+        newest = max(row.updated_at for row in rows) if rows else None
+        if newest is not None and (self._watermark is None or newest > self._watermark):
+            self._watermark = newest
+        digest = hashlib.sha1()
+        for (user_id, text), (category, updated_at) in sorted(self._learned.items()):
+            digest.update(f"{user_id}\t{text}\t{category}\t{updated_at}\n".encode())
+        self._version = f"online-{self.seed}-{digest.hexdigest()[:16]}"
+
+    def refresh_if_stale(self, db_factory, max_age: float = ONLINE_MODEL_UPDATE_INTERVAL):
+        """
+        Learn new corrections when the last update is older than `max_age`
+        seconds. One caller updates; the others keep using the current model
+        rather than reading, and learning, the same rows again.
+        """
+        if time.monotonic() - self._refreshed_at < max_age:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._refreshed_at < max_age:
+                return
+            self._refreshed_at = time.monotonic()
+            self._get_model()
+            db = db_factory()
+            try:
+                learned = self.update_from_db(db)
+                if learned:
+                    logger.info(f"Online categorizer learned {learned} corrections")
+            except Exception as e:
+                logger.error(f"Could not update the online categorizer: {e!r}")
+            finally:
+                db.close()
+        finally:
+            self._refresh_lock.release()
+
+    def version(self) -> str:
+        """
+        A digest of the corrections learned: processes with the same model
+        report the same version, and scan results cached before an update
+        aren't served after it.
+        """
+        return self._version
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._model is not None,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            **self._counts,
+        }
+
+
+def _corrections(db: Session):
+    return db.query(
+        CategoryOverride.user_id,
+        CategoryOverride.text,
+        CategoryOverride.category,
+        CategoryOverride.updated_at,
+    ).order_by(CategoryOverride.updated_at, CategoryOverride.user_id)
+
+
+online_model = OnlineCategorizer()
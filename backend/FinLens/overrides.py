@@ -0,0 +1,103 @@
+"""
+Per-user category overrides.
+
+When a user corrects the category of a scanned item, the correction is
+stored under the item's normalized text and wins over the model for that
+user from then on. Overrides are applied to scan results as they are
+returned, after the shared OCR result cache, so cached results stay
+user-independent. Each user's overrides are held in memory as one dict, so
+applying them costs a dict lookup per item.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from config import CATEGORY_OVERRIDE_CACHE_SIZE, CATEGORY_OVERRIDE_CACHE_TTL
+from line_parser import normalize_item_text
+from models import CategoryOverride
+
+# Longest normalized text stored (the column size)
+MAX_TEXT_LENGTH = 255
+
+override_cache = TTLCache(CATEGORY_OVERRIDE_CACHE_SIZE, CATEGORY_OVERRIDE_CACHE_TTL)
+
+
+def get_overrides(db: Session, user_id: int) -> Dict[str, str]:
+    """The user's overrides as {normalized text: category}."""
+    overrides = override_cache.get(user_id)
+    if overrides is None:
+        rows = (
+            db.query(CategoryOverride.text, CategoryOverride.category)
+            .filter(CategoryOverride.user_id == user_id)
+            .all()
+        )
+        overrides = {text: category for text, category in rows}
+        override_cache.set(user_id, overrides)
+    return overrides
+
+
+def save_corrections(
+    db: Session, user_id: int, corrections: Iterable[Tuple[str, str]]
+) -> int:
+    """
+    Store (item description, category) corrections, replacing earlier ones
+    for the same item. Returns how many items were saved.
+    """
+    latest = {}
+    for description, category in corrections:
+        text = normalize_item_text(description)[:MAX_TEXT_LENGTH]
+        if text:
+            latest[text] = category
+    if not latest:
+        return 0
+
+    now = datetime.utcnow()
+    existing = {
+        row.text: row
+        for row in db.query(CategoryOverride).filter(
+            CategoryOverride.user_id == user_id,
+            CategoryOverride.text.in_(list(latest)),
+        )
+    }
+    for text, category in latest.items():
+        row = existing.get(text)
+        if row is None:
+            db.add(
+                CategoryOverride(
+                    user_id=user_id, text=text, category=category, updated_at=now
+                )
+            )
+        else:
+            row.category = category
+            row.updated_at = now
+    db.commit()
+    override_cache.delete(user_id)
+    return len(latest)
+
+
+def apply_overrides(result: Dict[str, Any], overrides: Dict[str, str]) -> Dict[str, Any]:
+    """
+    A copy of an OCRResponse-shaped result with overridden item categories
+    and the per-category totals recomputed. `result` itself may be shared
+    through the OCR cache and is not modified.
+    """
+    if not overrides:
+        return result
+    items = []
+    changed = False
+    for item in result["line_items"]:
+        category = overrides.get(normalize_item_text(item["description"]))
+        if category is not None and category != item["category"]:
+            item = {**item, "category": category, "confidence": 1.0}
+            changed = True
+        items.append(item)
+    if not changed:
+        return result
+
+    categorized = defaultdict(float)
+    for item in items:
+        categorized[item["category"]] += item["amount"]
+    return {**result, "line_items": items, "categorized": dict(categorized)}
@@ -0,0 +1,174 @@
+"""
+The receipt scanning pipeline shared by the synchronous, batch and queued
+scan paths: result cache lookup, OCR on the process pool, line parsing and
+categorization.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+import utils
+from config import USE_OLLAMA, ONLINE_MODEL, CATEGORY_CONFIDENCE_THRESHOLD
+from database import SessionLocal
+from line_parser import parse_line
+from merchants import merchant_index
+from online_model import online_model
+from overrides import apply_overrides
+from metrics import ocr_metrics
+from ocr_cache import ocr_cache
+from ocr_pool import ocr_pool, ocr_image, ocr_pdf_page
+from ollama_client import ollama_client
+
+# Items categorized since startup: by merchant, by the model, and how many of
+# those the model was unsure of and handed to Ollama
+categorization_counts = {"items": 0, "merchant": 0, "model": 0, "fallback": 0}
+
+# Priced lines that sum up the items rather than being items themselves
+SUMMARY_KINDS = {"total", "subtotal", "tax"}
+
+
+async def scan(
+    contents: bytes, page: Optional[int] = None, run=None
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    OCR and parse an uploaded image, or one page of a PDF when `page` is
+    given. Returns the OCRResponse-shaped result and per-stage timings.
+    `run` submits work to the OCR pool (default `ocr_pool.run`); pool errors
+    propagate to the caller.
+    """
+    run = run or ocr_pool.run
+    started = time.perf_counter()
+    part = f"page={page}" if page is not None else ""
+    cache_key = await run_in_threadpool(ocr_cache.key, contents, part)
+    cached = await run_in_threadpool(ocr_cache.get, cache_key)
+    if cached is not None:
+        timings = {"cache": time.perf_counter() - started}
+        ocr_metrics.record_many(timings)
+        return cached, timings
+
+    # Decode/rasterize + Tesseract run in the OCR process pool, off the event loop
+    if page is None:
+        text, timings = await run(ocr_image, contents)
+    else:
+        text, timings = await run(ocr_pdf_page, contents, page)
+    result = await process_receipt_text(text, timings)
+
+    await run_in_threadpool(ocr_cache.set, cache_key, result)
+    ocr_metrics.record_many(timings)
+    return result, timings
+
+
+async def process_receipt_text(
+    text: str, timings: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    lines = text.split("\n")
+
+    merchant_name = utils.extract_merchant_name(text)
+
+    # Look for patterns like "Item $10.99"
+    parsed_items = []
+    uncategorized_lines = []
+    total = tax = timestamp = None
+
+    for parsed in filter(None, map(parse_line, lines)):
+        if parsed.kind == "total" and parsed.price is not None:
+            total = parsed.price
+        elif parsed.kind == "tax" and parsed.price is not None:
+            # Receipts may list several taxes (GST and PST)
+            tax = round((tax or 0) + parsed.price, 2)
+        elif parsed.kind == "timestamp" and timestamp is None:
+            timestamp = parsed.text
+
+        if parsed.price is None:
+            # Lines without recognizable price pattern
+            uncategorized_lines.append(parsed.text)
+        elif parsed.kind in SUMMARY_KINDS:
+            # Already counted in the items; adding them would count them twice
+            continue
+        elif parsed.description and parsed.price > 0:
+            parsed_items.append(parsed)
+
+    parsed = time.perf_counter()
+
+    # A well-known merchant decides the category of the whole receipt. Only
+    # the seed list is used here; users' history is applied by `personalize`
+    if ONLINE_MODEL:
+        await run_in_threadpool(online_model.refresh_if_stale, SessionLocal)
+    merchant_match = merchant_index.categorize(merchant_name)
+    descriptions = [item.description for item in parsed_items]
+    if merchant_match is not None:
+        categories = [merchant_match.category] * len(parsed_items)
+        confidences = [merchant_match.confidence] * len(parsed_items)
+    else:
+        # Categorize every item of the receipt in one model call
+        categories, confidences = await run_in_threadpool(
+            utils.categorize_with_confidence, [item.normalized for item in parsed_items]
+        )
+
+    # Items the local model isn't sure about go to Ollama concurrently, if configured
+    fallback = []
+    if USE_OLLAMA and merchant_match is None:
+        fallback = [
+            i
+            for i, confidence in enumerate(confidences)
+            if confidence < CATEGORY_CONFIDENCE_THRESHOLD
+        ]
+        if fallback:
+            answers = await ollama_client.categorize_many(
+                [descriptions[i] for i in fallback]
+            )
+            for i, category in zip(fallback, answers):
+                categories[i] = category
+                confidences[i] = None
+    categorization_counts["items"] += len(parsed_items)
+    categorization_counts["merchant" if merchant_match else "model"] += len(parsed_items)
+    categorization_counts["fallback"] += len(fallback)
+
+    items = []
+    categorized = {}
+    for item, category, confidence in zip(parsed_items, categories, confidences):
+        # Add to categorized expenses
+        if category in categorized:
+            categorized[category] += item.price
+        else:
+            categorized[category] = item.price
+
+        items.append(
+            {
+                "description": item.description,
+                "category": category,
+                "amount": item.price,
+                "quantity": item.quantity,
+                "unit": item.unit,
+                "confidence": confidence,
+            }
+        )
+
+    if timings is not None:
+        timings["parse"] = parsed - started
+        timings["categorize"] = time.perf_counter() - parsed
+
+    return {
+        "merchant": merchant_name,
+        "categorized": categorized,
+        "line_items": items,
+        "uncategorized_lines": uncategorized_lines,
+        "total": total,
+        "tax": tax,
+        "timestamp": timestamp,
+        "merchant_category": merchant_match.category if merchant_match else None,
+    }
+
+
+def personalize(
+    result: Dict[str, Any], user_id: int, overrides: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    A scan result as `user_id` sees it: their merchant history, then their
+    item overrides, applied to a copy. Refreshes the merchant history when it
+    is stale, so call it from a thread pool.
+    """
+    merchant_index.refresh_if_stale(SessionLocal)
+    return apply_overrides(merchant_index.apply_history(result, user_id), overrides)
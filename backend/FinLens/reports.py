@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import desc, func, literal, select, union_all
+from sqlalchemy.orm import Query, Session
+
+from cache import TTLCache
+from config import DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL
+from models import Budget, Expense, Income, MonthlyRollup
+
+dashboard_cache = TTLCache(DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL)
+
+
+def _is_month_start(when: datetime) -> bool:
+    return when.day == 1 and when.time() == datetime.min.time()
+
+
+def spend_by_category_query(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> Query:
+    """
+    One grouped aggregate of a user's expenses in [start, end), with columns
+    (category, total). Usable directly or as a subquery to join against.
+    Whole-month ranges are answered from monthly_rollup instead of raw rows.
+    """
+    if _is_month_start(start) and _is_month_start(end):
+        return (
+            db.query(
+                MonthlyRollup.category, func.sum(MonthlyRollup.total).label("total")
+            )
+            .filter(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.kind == "expense",
+                MonthlyRollup.month >= start.date(),
+                MonthlyRollup.month < end.date(),
+            )
+            .group_by(MonthlyRollup.category)
+        )
+
+    return (
+        db.query(Expense.category, func.sum(Expense.amount).label("total"))
+        .filter(
+            Expense.user_id == user_id,
+            Expense.date >= start,
+            Expense.date < end,
+        )
+        .group_by(Expense.category)
+    )
+
+
+def spend_by_category(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> Dict[str, Decimal]:
+    """Total spent per category in [start, end)."""
+    return {
+        category: total
+        for category, total in spend_by_category_query(db, user_id, start, end)
+    }
+
+
+def budget_alerts(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """BudgetAlert-shaped dicts for budgets at 80% or more of this month's spend."""
+    # utils loads the categorizer; crud imports this module
+    from utils import get_month_range
+
+    # Get current month to calculate monthly expenses
+    start_of_month, end_of_month = get_month_range()
+
+    # Budgets joined to this month's spend per category, in a single query
+    spent = spend_by_category_query(db, user_id, start_of_month, end_of_month).subquery()
+    rows = (
+        db.query(
+            Budget.category,
+            Budget.amount,
+            Budget.icon,
+            func.coalesce(spent.c.total, 0),
+        )
+        .outerjoin(spent, spent.c.category == Budget.category)
+        .filter(Budget.user_id == user_id)
+        .all()
+    )
+
+    alerts = []
+    for category, budget_amount, icon, total_spent in rows:
+        total_spent = Decimal(str(total_spent))
+
+        # Check if budget threshold is reached
+        if total_spent > budget_amount:
+            alert_status = "EXCEEDED"
+        elif total_spent >= budget_amount * Decimal("0.8"):  # 80% of budget
+            alert_status = "NEAR_LIMIT"
+        else:
+            continue
+
+        alerts.append(
+            {
+                "category": category,
+                "budget": float(budget_amount),
+                "spent": float(total_spent),
+                "status": alert_status,
+                "icon": icon,
+            }
+        )
+    return alerts
+
+
+def invalidate_dashboard(user_id: int) -> None:
+    dashboard_cache.delete(user_id)
+
+
+def _transactions(model, label_column, kind, bucket, user_id, since=None, limit=None):
+    stmt = (
+        select(
+            literal(kind).label("kind"),
+            literal(bucket).label("bucket"),
+            label_column.label("label"),
+            model.icon,
+            model.date,
+            model.amount,
+        )
+        .where(model.user_id == user_id)
+        .order_by(desc(model.date))
+    )
+    if since is not None:
+        stmt = stmt.where(model.date >= since)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    # Wrapped so ORDER BY/LIMIT stay inside each branch of the UNION ALL
+    return select(stmt.subquery())
+
+
+def build_dashboard(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    Dashboard payload in two round trips: one for both all-time totals (read
+    from monthly_rollup) and one UNION ALL for the recent lists and the
+    30/60-day windows, selecting only the columns the dashboard shows.
+    """
+    total_income, total_expense = db.execute(
+        select(
+            *(
+                select(func.coalesce(func.sum(MonthlyRollup.total), 0))
+                .where(MonthlyRollup.user_id == user_id, MonthlyRollup.kind == kind)
+                .scalar_subquery()
+                for kind in ("income", "expense")
+            )
+        )
+    ).one()
+
+    now = datetime.utcnow()
+    rows = db.execute(
+        union_all(
+            _transactions(Income, Income.source, "income", "recent", user_id, limit=5),
+            _transactions(
+                Expense, Expense.category, "expense", "recent", user_id, limit=5
+            ),
+            _transactions(
+                Expense,
+                Expense.category,
+                "expense",
+                "last30",
+                user_id,
+                since=now - timedelta(days=30),
+            ),
+            _transactions(
+                Income,
+                Income.source,
+                "income",
+                "last60",
+                user_id,
+                since=now - timedelta(days=60),
+            ),
+        )
+    ).all()
+
+    buckets = {"recent": [], "last30": [], "last60": []}
+    for row in rows:
+        buckets[row.bucket].append(row)
+    for bucket in buckets.values():
+        bucket.sort(key=lambda row: row.date, reverse=True)
+
+    label_key = {"income": "source", "expense": "category"}
+    recent_transactions = [
+        {
+            "type": row.kind,
+            label_key[row.kind]: row.label,
+            "icon": row.icon,
+            "date": row.date,
+            "amount": float(row.amount),
+        }
+        for row in buckets["recent"][:5]
+    ]
+
+    return {
+        "totalBalance": total_income - total_expense,
+        "totalIncome": total_income,
+        "totalExpense": total_expense,
+        "RecentTransactions": recent_transactions,
+        "last30DaysExpenses": {
+            "transactions": [
+                {
+                    "category": row.label,
+                    "amount": float(row.amount),
+                    "date": row.date,
+                    "icon": row.icon,
+                }
+                for row in buckets["last30"]
+            ]
+        },
+        "last60DaysIncome": {
+            "transactions": [
+                {
+                    "source": row.label,
+                    "amount": float(row.amount),
+                    "date": row.date,
+                    "icon": row.icon,
+                }
+                for row in buckets["last60"]
+            ]
+        },
+    }
+
+
+def get_dashboard(db: Session, user_id: int) -> Dict[str, Any]:
+    """Cached dashboard for a user; repeat loads cost no SQL until invalidated."""
+    dashboard = dashboard_cache.get(user_id)
+    if dashboard is None:
+        dashboard = build_dashboard(db, user_id)
+        dashboard_cache.set(user_id, dashboard)
+    return dashboard
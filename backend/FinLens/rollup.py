@@ -0,0 +1,182 @@
+"""
+Maintenance of the monthly_rollup table.
+
+Writes go through `record`/`record_many` inside the same transaction as the
+income or expense change. The table can be rebuilt from raw rows and checked
+against them from the command line:
+
+    python rollup.py rebuild [--user-id N]
+    python rollup.py check [--user-id N]
+"""
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Query, Session
+
+from models import Expense, Income, MonthlyRollup
+
+KINDS = {
+    "income": (Income, Income.source),
+    "expense": (Expense, Expense.category),
+}
+
+RollupKey = Tuple[int, str, date, str]  # (user_id, kind, month, category)
+
+CENTS = Decimal("0.01")
+
+
+def month_start(when: datetime) -> date:
+    return date(when.year, when.month, 1)
+
+
+def _upsert_statement(db: Session, rows):
+    """Insert rows, adding total/count onto any row that already exists."""
+    table = MonthlyRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            total=table.c.total + stmt.inserted.total,
+            count=table.c.count + stmt.inserted.count,
+        )
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key.columns],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "count": table.c.count + stmt.excluded.count,
+        },
+    )
+
+
+def record_many(db: Session, deltas: Dict[RollupKey, Tuple[Decimal, int]]) -> None:
+    """
+    Apply (amount, count) deltas to the rollup in one statement. Does not
+    commit: callers commit together with the rows the deltas describe.
+    """
+    if not deltas:
+        return
+    rows = [
+        {
+            "user_id": user_id,
+            "kind": kind,
+            "month": month,
+            "category": category,
+            "total": total,
+            "count": count,
+        }
+        for (user_id, kind, month, category), (total, count) in deltas.items()
+    ]
+    db.execute(_upsert_statement(db, rows))
+
+
+def record(
+    db: Session,
+    user_id: int,
+    kind: str,
+    category: str,
+    when: datetime,
+    amount,
+    count: int = 1,
+) -> None:
+    """Add one income/expense (count=1) or remove one (negative amount, count=-1)."""
+    key = (user_id, kind, month_start(when), category)
+    record_many(db, {key: (Decimal(str(amount)), count)})
+
+
+def aggregate_raw(
+    db: Session, user_id: Optional[int] = None
+) -> Dict[RollupKey, Tuple[Decimal, int]]:
+    """Recompute the rollup from the income and expense tables."""
+    totals: Dict[RollupKey, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for kind, (model, label) in KINDS.items():
+        year = extract("year", model.date)
+        month = extract("month", model.date)
+        query = db.query(
+            model.user_id, label, year, month, func.sum(model.amount), func.count()
+        ).group_by(model.user_id, label, year, month)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        for row_user_id, category, y, m, total, count in query:
+            key = (row_user_id, kind, date(int(y), int(m), 1), category)
+            totals[key][0] += Decimal(str(total)).quantize(CENTS)
+            totals[key][1] += count
+    return {key: (total, count) for key, (total, count) in totals.items()}
+
+
+def _stored(db: Session, user_id: Optional[int]) -> Query:
+    query = db.query(MonthlyRollup)
+    if user_id is not None:
+        query = query.filter(MonthlyRollup.user_id == user_id)
+    return query
+
+
+def rebuild(db: Session, user_id: Optional[int] = None, chunk_size: int = 1000) -> int:
+    """Replace the rollup (for one user or everyone) with freshly aggregated rows."""
+    deltas = aggregate_raw(db, user_id)
+    _stored(db, user_id).delete(synchronize_session=False)
+
+    items = list(deltas.items())
+    for i in range(0, len(items), chunk_size):
+        record_many(db, dict(items[i : i + chunk_size]))
+    db.commit()
+    return len(items)
+
+
+def check(db: Session, user_id: Optional[int] = None):
+    """Return (key, expected, stored) for every rollup row that disagrees with raw data."""
+    expected = aggregate_raw(db, user_id)
+    stored = {
+        (row.user_id, row.kind, row.month, row.category): (
+            Decimal(str(row.total)).quantize(CENTS),
+            row.count,
+        )
+        for row in _stored(db, user_id)
+        if row.count != 0 or row.total != 0
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        if expected.get(key) != stored.get(key):
+            mismatches.append((key, expected.get(key), stored.get(key)))
+    return mismatches
+
+
+def main(argv=None):
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Monthly rollup maintenance")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            count = rebuild(db, args.user_id)
+            print(f"Rebuilt {count} rollup rows")
+        else:
+            mismatches = check(db, args.user_id)
+            for key, expected, stored in mismatches:
+                print(f"MISMATCH {key}: expected {expected}, stored {stored}")
+            if mismatches:
+                sys.exit(1)
+            print("Rollup is consistent with income and expense")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from schemas import UserCreate, UserResponse, Token
-from crud import get_user_by_email, create_user
-from auth import verify_password, create_access_token
+from crud import get_user_by_email, create_user, update_password_hash
+from auth import (
+    create_access_token,
+    access_token_claims,
+    get_password_hash_async,
+    verify_and_rehash_async,
+)
 from datetime import timedelta
 from typing import Optional
 from dependencies import get_db, get_current_user
@@ -23,7 +29,7 @@ async def register(
     profile_image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
-    db_user = get_user_by_email(db, email)
+    db_user = await run_in_threadpool(get_user_by_email, db, email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -53,22 +59,38 @@ async def register(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading image: {e}")
 
-    return create_user(db, user_create_data, profile_image_path=profile_image_path)
+    hashed_password = await get_password_hash_async(password)
+    return await run_in_threadpool(
+        create_user,
+        db,
+        user_create_data,
+        profile_image_path=profile_image_path,
+        hashed_password=hashed_password,
+    )
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
-    user = get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(get_user_by_email, db, form_data.username)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_rehash_async(
+            form_data.password, user.password_hash
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password"
         )
 
+    # Transparently upgrade hashes made with an older bcrypt cost
+    if new_hash:
+        await run_in_threadpool(update_password_hash, db, user, new_hash)
+
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=access_token_claims(user), expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
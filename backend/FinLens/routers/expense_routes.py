@@ -1,82 +1,123 @@
-import tempfile
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from schemas import ExpenseResponse, ExpenseCreate
-from crud import get_expenses, create_expense, get_expense_by_id, delete_expense
-from dependencies import get_current_user, get_db
-from fastapi.responses import FileResponse
-from starlette.background import BackgroundTasks
-from models import User
-import pandas as pd
-import os
+from schemas import ExpenseResponse, ExpenseCreate, BulkIngestResponse
+from crud import (
+    get_expenses_page,
+    create_expense,
+    get_expense_by_id,
+    delete_expense,
+)
+from dependencies import get_async_db, get_current_user, get_db
+from models import User, Expense
+from exporter import EXPORT_FORMATS, export_response
+from ingest import ingest, rows_from_request
+from config import BULK_MAX_ROWS
 
 router = APIRouter(prefix="/expense", tags=["Expense"])
 
 
-@router.get("/download")
-def download_expense_data(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
-):
-    background_tasks = BackgroundTasks()
-    temp_file_path = None
-    try:
-        items = get_expenses(db, user_id=current_user.id)
-        if not items:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No expense data found for this user",
-            )
-        df = pd.DataFrame([item.__dict__ for item in items])
-        df.drop("_sa_instance_state", axis=1, inplace=True, errors="ignore")
+def _has_expenses(db: Session, user_id: int) -> bool:
+    return (
+        db.query(Expense.id).filter(Expense.user_id == user_id).first() is not None
+    )
 
-        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp_file:
-            df.to_excel(tmp_file.name, index=False, engine="openpyxl")
-            temp_file_path = tmp_file.name
-            background_tasks.add_task(os.remove, temp_file_path)
 
-        return FileResponse(
-            temp_file_path,
-            filename="expense_data.xlsx",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            background=background_tasks,
-        )
-    except Exception as e:
-        print(
-            f"An error occurred during expense Excel generation or file response: {e}"
+@router.get("/download")
+async def download_expense_data(
+    export_format: str = Query("xlsx", alias="format"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the user's full expense history as xlsx (default), csv or ndjson."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}",
         )
+    if not await db.run_sync(_has_expenses, current_user.id):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating expense Excel file: {e}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No expense data found for this user",
         )
-    finally:
-        if temp_file_path and not background_tasks.tasks:
-            os.remove(temp_file_path)
+    return export_response(
+        Expense, current_user.id, export_format, name="expense_data"
+    )
 
 
 @router.post("/", response_model=ExpenseResponse)
-def add_expense(
+async def add_expense(
     expense: ExpenseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    return create_expense(db, expense, user_id=current_user.id)
+    return await db.run_sync(create_expense, expense, user_id=current_user.id)
 
 
 @router.get("/", response_model=List[ExpenseResponse])
-def fetch_expenses(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def fetch_expenses(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Newest first. When more rows exist, X-Next-Cursor holds the cursor for the next page."""
+    try:
+        items, next_cursor = await db.run_sync(
+            get_expenses_page,
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.post("/bulk", response_model=BulkIngestResponse)
+async def bulk_add_expenses(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
-    return get_expenses(db, user_id=current_user.id)
+    """
+    Add many expenses at once from a JSON array of ExpenseCreate objects or an
+    uploaded CSV/OFX `file`. Valid rows are inserted; invalid ones are reported
+    by 1-based row number.
+    """
+    try:
+        rows = await rows_from_request(request, "expense")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per request",
+        )
+    return await run_in_threadpool(ingest, db, "expense", rows, current_user.id)
 
 
 @router.get("/{expense_id}", response_model=ExpenseResponse)
-def fetch_expense_by_id(
+async def fetch_expense_by_id(
     expense_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_expense = get_expense_by_id(db, expense_id=expense_id, user_id=current_user.id)
+    db_expense = await db.run_sync(
+        get_expense_by_id, expense_id=expense_id, user_id=current_user.id
+    )
     if not db_expense:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Expense not found"
@@ -85,16 +126,18 @@ def fetch_expense_by_id(
 
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_expense_by_id(
+async def delete_expense_by_id(
     expense_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_expense = get_expense_by_id(db, expense_id=expense_id, user_id=current_user.id)
-    if not db_expense:
+    # delete_expense only deletes the user's own row and reports whether it found one
+    deleted = await db.run_sync(
+        delete_expense, expense_id=expense_id, user_id=current_user.id
+    )
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Expense not found or you do not have permission to delete it",
         )
-    delete_expense(db, expense_id=expense_id, user_id=current_user.id)
     return None
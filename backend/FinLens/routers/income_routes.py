@@ -1,81 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
-from starlette.background import BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from schemas import IncomeCreate, IncomeResponse
-from crud import create_income, get_incomes, get_income_by_id, delete_income
-from dependencies import get_current_user, get_db
-from models import User
-from typing import List
-import pandas as pd
-import os
-import tempfile
+from schemas import IncomeCreate, IncomeResponse, BulkIngestResponse
+from crud import (
+    create_income,
+    get_incomes_page,
+    get_income_by_id,
+    delete_income,
+)
+from dependencies import get_async_db, get_current_user, get_db
+from models import User, Income
+from exporter import EXPORT_FORMATS, export_response
+from ingest import ingest, rows_from_request
+from config import BULK_MAX_ROWS
+from typing import List, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/income", tags=["Income"])
 
 
+def _has_incomes(db: Session, user_id: int) -> bool:
+    return (
+        db.query(Income.id).filter(Income.user_id == user_id).first() is not None
+    )
+
+
 @router.post("/", response_model=IncomeResponse)
-def add_income(
+async def add_income(
     income: IncomeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    return create_income(db, income, user_id=current_user.id)
+    return await db.run_sync(create_income, income, user_id=current_user.id)
 
 
 @router.get("/", response_model=List[IncomeResponse])
-def fetch_all_incomes(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def fetch_all_incomes(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    source: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
-    return get_incomes(db, user_id=current_user.id)
+    """Newest first. When more rows exist, X-Next-Cursor holds the cursor for the next page."""
+    try:
+        items, next_cursor = await db.run_sync(
+            get_incomes_page,
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+            start_date=start_date,
+            end_date=end_date,
+            source=source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 @router.get("/download")
-def download_income_data(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def download_income_data(
+    export_format: str = Query("xlsx", alias="format"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
-    background_tasks = BackgroundTasks()
-    temp_file_path = None
-    try:
-        items = get_incomes(db, user_id=current_user.id)
-        if not items:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No income data found for this user",
-            )
-        df = pd.DataFrame([item.__dict__ for item in items])
-        df.drop("_sa_instance_state", axis=1, inplace=True, errors="ignore")
+    """Stream the user's full income history as xlsx (default), csv or ndjson."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    if not await db.run_sync(_has_incomes, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No income data found for this user",
+        )
+    return export_response(
+        Income, current_user.id, export_format, name="income_data"
+    )
 
-        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp_file:
-            df.to_excel(tmp_file.name, index=False, engine="openpyxl")
-            temp_file_path = tmp_file.name
-            background_tasks.add_task(os.remove, temp_file_path)
 
-        return FileResponse(
-            temp_file_path,
-            filename="income_data.xlsx",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            background=background_tasks,
-        )
-    except Exception as e:
-        print(f"An error occurred: {e}")
+@router.post("/bulk", response_model=BulkIngestResponse)
+async def bulk_add_incomes(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Add many incomes at once from a JSON array of IncomeCreate objects or an
+    uploaded CSV/OFX `file`. Valid rows are inserted; invalid ones are reported
+    by 1-based row number.
+    """
+    try:
+        rows = await rows_from_request(request, "income")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(rows) > BULK_MAX_ROWS:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating Excel file: {e}",
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per request",
         )
-    finally:
-        # Ensure cleanup happens even if temp_file was not created due to an error
-        if temp_file_path and not background_tasks.tasks:
-            os.remove(temp_file_path)
+    return await run_in_threadpool(ingest, db, "income", rows, current_user.id)
 
 
 @router.get("/{income_id}", response_model=IncomeResponse)
-def fetch_income_by_id(
+async def fetch_income_by_id(
     income_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_income = get_income_by_id(db, income_id=income_id, user_id=current_user.id)
+    db_income = await db.run_sync(
+        get_income_by_id, income_id=income_id, user_id=current_user.id
+    )
     if not db_income:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Income not found"
@@ -84,16 +126,18 @@ def fetch_income_by_id(
 
 
 @router.delete("/{income_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_income_by_id(
+async def delete_income_by_id(
     income_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_income = get_income_by_id(db, income_id=income_id, user_id=current_user.id)
-    if not db_income:
+    # delete_income only deletes the user's own row and reports whether it found one
+    deleted = await db.run_sync(
+        delete_income, income_id=income_id, user_id=current_user.id
+    )
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Income not found or you do not have permission to delete it",
         )
-    delete_income(db, income_id=income_id, user_id=current_user.id)
     return None
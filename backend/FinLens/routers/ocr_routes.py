@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any
-import pytesseract
-from PIL import Image
-import io
-import re
-from datetime import datetime
-import os
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import functools
+import json
 import logging
 
 from dependencies import get_db, get_current_user
 from models import User
-from schemas import OCRResponse
-import utils
+from schemas import (
+    OCRResponse,
+    OCRJobResponse,
+    CategoryCorrection,
+    CategoryCorrectionsResponse,
+)
+from metrics import ocr_metrics, server_timing_header
+from config import OCR_BATCH_MAX_PAGES
+from ocr_pool import ocr_pool, pdf_page_count, OCRPoolSaturated, OCRPoolUnavailable
+from ocr_cache import ocr_cache
+from receipts import scan, categorization_counts, personalize
+from ocr_jobs import create_job, get_job, job_response, ocr_job_worker
+from online_model import online_model
+from overrides import get_overrides, override_cache, save_corrections
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -28,9 +39,15 @@ if not logger.handlers:
 
 router = APIRouter(prefix="/ocr", tags=["OCR"])
 
+PDF_CONTENT_TYPES = {"application/pdf", "application/x-pdf"}
+BATCH_STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+# How often a batch page waits and retries when the OCR pool is saturated
+BATCH_SATURATED_RETRIES = 8
+
 
 @router.post("/scan-receipt", response_model=OCRResponse)
 async def scan_receipt(
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -46,16 +63,20 @@ async def scan_receipt(
     contents = await file.read()
 
     try:
-        image = Image.open(io.BytesIO(contents))
-
-        # Extract text from image using pytesseract
-        extracted_text = pytesseract.image_to_string(image)
-        logger.info(f"Extracted text from receipt: {extracted_text[:100]}...")
-
-        # Process the extracted text to find receipt items and amounts
-        categorized_expenses = process_receipt_text(extracted_text)
-
-        return categorized_expenses
+        # Re-uploads of the same photo are answered from the result cache;
+        # anything else is OCR'd on the pool and parsed into line items
+        categorized_expenses, timings = await scan(contents)
+        logger.info(f"Scanned receipt from {categorized_expenses['merchant'][:100]}")
+    except OCRPoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except OCRPoolUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise HTTPException(
@@ -63,67 +84,197 @@ async def scan_receipt(
             detail=f"Error processing image: {str(e)}",
         )
 
+    overrides = await run_in_threadpool(get_overrides, db, current_user.id)
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return await run_in_threadpool(
+        personalize, categorized_expenses, current_user.id, overrides
+    )
+
+
+@router.post("/scan-batch")
+async def scan_batch(
+    files: List[UploadFile] = File(...),
+    stream_format: str = Query("ndjson", alias="format"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Scan several receipt images and/or PDFs in one request. Every image and
+    every PDF page is OCR'd in parallel on the OCR pool, and one result per
+    image or page is streamed back as soon as it is ready (completion order),
+    as NDJSON (default) or server-sent events. Each result carries `file`,
+    `page` (PDF pages only) and either `result` (an OCRResponse) or `error`;
+    a final `{"done": true}` record closes the stream.
+    """
+    if stream_format not in BATCH_STREAM_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Use one of: {', '.join(BATCH_STREAM_FORMATS)}",
+        )
 
-def process_receipt_text(text: str) -> Dict[str, Any]:
-    lines = text.split("\n")
-
-    # Extract merchant name (usually at the top)
-    merchant_name = lines[0] if lines and lines[0] else "Unknown Merchant"
-
-    # Look for patterns like "Item $10.99"
-    items = []
-    categorized = {}
-    uncategorized_lines = []
-
-    for line in lines:
-        # Skip empty lines
-        if not line.strip():
-            continue
-
-        # Clean line
-        cleaned_line = utils.clean_line_start(line.strip())
-
-        # Look for price patterns
-        price_match = re.search(r"\$?(\d+\.\d{2})", cleaned_line)
-        if price_match:
-            price = float(price_match.group(1))
-
-            # Extract item description (everything before the price)
-            item_text = cleaned_line[: price_match.start()].strip()
-            item_text = utils.strip_price(item_text)
-
-            if item_text and price > 0:
-                # Categorize the item
-                try:
-                    # First try local ML model
-                    category = utils.categorize_text_local(item_text)
-
-                    # If that fails or returns "Other", try Ollama API if configured
-                    if (
-                        category == "Other"
-                        and os.getenv("USE_OLLAMA", "false").lower() == "true"
-                    ):
-                        category = utils.call_ollama_model(item_text)
-                except Exception as e:
-                    logger.error(f"Error categorizing text: {str(e)}")
-                    category = "Other"
-
-                # Add to categorized expenses
-                if category in categorized:
-                    categorized[category] += price
-                else:
-                    categorized[category] = price
-
-                items.append(
-                    {"description": item_text, "category": category, "amount": price}
+    pages: List[Tuple[str, bytes, Optional[int]]] = []
+    for file in files:
+        name = file.filename or "upload"
+        contents = await file.read()
+        if file.content_type in PDF_CONTENT_TYPES or name.lower().endswith(".pdf"):
+            try:
+                count = await run_in_threadpool(pdf_page_count, contents)
+            except Exception:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Could not read PDF '{name}'",
                 )
+            pages.extend((name, contents, number) for number in range(count))
+        elif file.content_type and file.content_type.startswith("image/"):
+            pages.append((name, contents, None))
         else:
-            # Lines without recognizable price pattern
-            uncategorized_lines.append(cleaned_line)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"'{name}' is neither an image nor a PDF",
+            )
+        if len(pages) > OCR_BATCH_MAX_PAGES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {OCR_BATCH_MAX_PAGES} images and PDF pages per batch",
+            )
+
+    overrides = await run_in_threadpool(get_overrides, db, current_user.id)
+    return StreamingResponse(
+        _stream_batch(pages, stream_format, current_user.id, overrides),
+        media_type=BATCH_STREAM_FORMATS[stream_format],
+    )
+
+
+async def _run_when_free(semaphore: asyncio.Semaphore, fn, *args):
+    """Run on the OCR pool, waiting for room instead of failing when it is saturated."""
+    async with semaphore:
+        for attempt in range(BATCH_SATURATED_RETRIES):
+            try:
+                return await ocr_pool.run(fn, *args)
+            except OCRPoolSaturated:
+                await asyncio.sleep(0.25 * 2 ** min(attempt, 3))
+        return await ocr_pool.run(fn, *args)
+
+
+async def _scan_page(
+    semaphore: asyncio.Semaphore,
+    user_id: int,
+    overrides: Dict[str, str],
+    name: str,
+    contents: bytes,
+    page: Optional[int],
+) -> Dict[str, Any]:
+    entry = {"file": name, "page": page + 1 if page is not None else None}
+    try:
+        result, _ = await scan(
+            contents, page, run=functools.partial(_run_when_free, semaphore)
+        )
+    except Exception as e:
+        logger.error(f"Error scanning {name} (page {entry['page']}): {str(e)}")
+        return {**entry, "error": str(e) or e.__class__.__name__}
+    result = await run_in_threadpool(personalize, result, user_id, overrides)
+    return {**entry, "result": result}
+
+
+def _format_event(record: Dict[str, Any], stream_format: str) -> bytes:
+    data = json.dumps(record)
+    if stream_format == "sse":
+        event = "done" if record.get("done") else "result"
+        return f"event: {event}\ndata: {data}\n\n".encode()
+    return (data + "\n").encode()
+
+
+async def _stream_batch(
+    pages, stream_format: str, user_id: int, overrides: Dict[str, str]
+):
+    # At most one page per worker from this batch at a time, so a big batch
+    # queues behind itself rather than filling the pool's wait queue
+    semaphore = asyncio.Semaphore(ocr_pool.workers)
+    tasks = [
+        asyncio.ensure_future(_scan_page(semaphore, user_id, overrides, *page))
+        for page in pages
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield _format_event(await finished, stream_format)
+        yield _format_event({"done": True, "pages": len(pages)}, stream_format)
+    finally:
+        # Client went away mid-stream: don't keep OCR'ing pages nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+@router.post(
+    "/jobs", response_model=OCRJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_ocr_job(
+    response: Response,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue a receipt scan and return its job id at once; poll GET /ocr/jobs/{id}."""
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only image files are supported",
+        )
+    contents = await file.read()
+    job = await run_in_threadpool(
+        create_job, db, current_user.id, contents, file.filename
+    )
+    response.headers["Location"] = f"/api/v1/ocr/jobs/{job.id}"
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=OCRJobResponse)
+def fetch_ocr_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="OCR job not found"
+        )
+    body = job_response(job)
+    if body["result"] is not None:
+        body["result"] = personalize(
+            body["result"], current_user.id, get_overrides(db, current_user.id)
+        )
+    return body
+
+
+@router.post("/corrections", response_model=CategoryCorrectionsResponse)
+def save_category_corrections(
+    corrections: List[CategoryCorrection],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Record the categories a user chose for scanned items. Later scans
+    categorize those items the same way for this user, and the online
+    categorizer learns from them.
+    """
+    saved = save_corrections(
+        db, current_user.id, [(c.description, c.category) for c in corrections]
+    )
+    return {"saved": saved}
+
 
+@router.get("/metrics")
+def get_ocr_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Per-stage OCR timings, pool occupancy, result and override caches, job
+    worker and online categorizer counts, and how items were categorized.
+    """
     return {
-        "merchant": merchant_name,
-        "categorized": categorized,
-        "line_items": items,
-        "uncategorized_lines": uncategorized_lines,
+        "pool": ocr_pool.stats(),
+        "cache": ocr_cache.stats(),
+        "jobs": ocr_job_worker.stats(),
+        "overrides": override_cache.stats(),
+        "online_model": online_model.stats(),
+        "categorization": categorization_counts,
+        "stages": ocr_metrics.snapshot(),
     }
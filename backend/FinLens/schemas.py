@@ -1,8 +1,10 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict
+from pydantic import BaseModel, EmailStr, FiniteFloat, field_validator
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 from fastapi import UploadFile
 
+from utils import valid_categories
+
 
 class UserCreate(BaseModel):
     full_name: str
@@ -34,7 +36,7 @@ class TokenData(BaseModel):
 class IncomeBase(BaseModel):
     source: str
     icon: Optional[str]
-    amount: float
+    amount: FiniteFloat
     date: datetime
 
 
@@ -49,11 +51,22 @@ class IncomeResponse(IncomeBase):
         orm_mode = True
 
 
+# Longest merchant name stored (the column size)
+MAX_MERCHANT_LENGTH = 100
+
+
 class ExpenseBase(BaseModel):
     category: str
     icon: Optional[str]
-    amount: float
+    amount: FiniteFloat
     date: datetime
+    merchant: Optional[str] = None  # set for expenses saved from a scanned receipt
+
+    @field_validator("merchant")
+    @classmethod
+    def truncate_merchant(cls, value: Optional[str]) -> Optional[str]:
+        # The frontend sends the receipt's first OCR line as is; keep what fits
+        return value[:MAX_MERCHANT_LENGTH] if value else value
 
 
 class ExpenseCreate(ExpenseBase):
@@ -71,7 +84,7 @@ class ExpenseResponse(ExpenseBase):
 class BudgetBase(BaseModel):
     category: str
     icon: Optional[str]
-    amount: float
+    amount: FiniteFloat
 
 
 class BudgetCreate(BudgetBase):
@@ -101,6 +114,11 @@ class OCRLineItem(BaseModel):
     description: str
     category: str
     amount: float
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    # Probability of the category (merchant match confidence for a whole-receipt
+    # match); None when it came from Ollama
+    confidence: Optional[float] = None
 
 
 class OCRResponse(BaseModel):
@@ -108,3 +126,40 @@ class OCRResponse(BaseModel):
     categorized: Dict[str, float]
     line_items: List[OCRLineItem]
     uncategorized_lines: List[str]
+    total: Optional[float] = None
+    tax: Optional[float] = None
+    timestamp: Optional[str] = None  # the receipt's date/time line, as printed
+    # Set when the merchant decided the category of every item
+    merchant_category: Optional[str] = None
+
+
+class CategoryCorrection(BaseModel):
+    description: str  # the scanned item's description
+    category: Literal[tuple(sorted(valid_categories))]
+
+
+class CategoryCorrectionsResponse(BaseModel):
+    saved: int
+
+
+class OCRJobResponse(BaseModel):
+    id: str
+    status: str  # "queued", "running", "done" or "failed"
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[OCRResponse] = None
+    error: Optional[str] = None
+
+
+# Bulk ingestion schemas
+class BulkRowError(BaseModel):
+    row: int  # 1-based position in the submitted array or file
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
@@ -1,11 +1,44 @@
-import pandas as pd
+"""
+Receipt categorizer training.
+
+    python train_model.py evaluate [--dataset synthetic] [--dataset csv:labels.csv]
+    python train_model.py train --engine hashing --seed 42
+
+Runs are reproducible: the synthetic dataset, fold assignment and model
+depend only on --seed and the datasets. `train` cross-validates, fits on all
+the data, measures throughput against the current artifact on the same
+items, and refuses to publish a model that is slower or less accurate than
+it (see MAX_THROUGHPUT_REGRESSION, MAX_ACCURACY_REGRESSION).
+"""
+import argparse
+import hashlib
+import json
 import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
-import joblib
-from preprocess import preprocess_line
+from config import MODEL_DIR, CATEGORIZER_ENGINE
+from hashing_categorizer import HashingCategorizer
+from line_parser import normalize_item_text
+import model_registry
+
+# A new model may be at most this much slower (items/s, measured side by side
+# with the current artifact) or less accurate (k-fold, same dataset) than the
+# current one, unless --allow-regression is given
+MAX_THROUGHPUT_REGRESSION = 0.10
+MAX_ACCURACY_REGRESSION = 0.005
+# Items per predict call when measuring throughput: a typical receipt
+THROUGHPUT_BATCH_SIZE = 20
+THROUGHPUT_ROUNDS = 3
 
 # 1. Base dataset
 base_dataset = {
@@ -142,38 +175,276 @@ base_dataset = {
 }
 
 # 2. Expand to 100 samples per category
-dataset = {}
-for category, samples in base_dataset.items():
-    dataset[category] = []
-    for _ in range(100):
-        item = random.choice(samples)
-        dataset[category].append(item)
-        quantity = random.randint(1, 5)
-        dataset[category].append(f"{item} x{quantity}")
+def build_dataset(
+    seed: int,
+    samples_per_category: int = 100,
+    base: Optional[Dict[str, List[str]]] = None,
+) -> pd.DataFrame:
+    rng = random.Random(seed)
+    data = []
+    for category, samples in (base or base_dataset).items():
+        for _ in range(samples_per_category):
+            item = rng.choice(samples)
+            quantity = rng.randint(1, 5)
+            data.append((item.lower(), category))
+            data.append((f"{item} x{quantity}".lower(), category))
+
+    return pd.DataFrame(data, columns=["item_text", "category"])
+
+
+def load_csv_dataset(path: str) -> pd.DataFrame:
+    """
+    Labelled receipt items from a CSV with item_text and category columns.
+    Texts go through the same normalization as scanned items.
+    """
+    df = pd.read_csv(path, usecols=["item_text", "category"], dtype=str).dropna()
+    df["item_text"] = df["item_text"].map(normalize_item_text)
+    return df[df["item_text"] != ""].reset_index(drop=True)
+
+
+def load_datasets(specs: List[str], seed: int) -> pd.DataFrame:
+    """
+    Concatenate datasets named by `specs`: "synthetic" (build_dataset with
+    `seed`) or "csv:PATH" (load_csv_dataset).
+    """
+    frames = []
+    for spec in specs:
+        if spec == "synthetic":
+            frames.append(build_dataset(seed))
+        elif spec.startswith("csv:"):
+            frames.append(load_csv_dataset(spec[4:]))
+        else:
+            raise ValueError(f"Unknown dataset {spec!r}; use 'synthetic' or 'csv:PATH'")
+    return pd.concat(frames, ignore_index=True)
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    for text, category in zip(df["item_text"], df["category"]):
+        digest.update(f"{text}\t{category}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+def make_model(engine: str = "pipeline"):
+    if engine == "hashing":
+        return HashingCategorizer()
+    return make_pipeline(CountVectorizer(), MultinomialNB())
+
+
+def drop_process_state(model, engine: str) -> None:
+    """
+    Make the saved artifact depend only on the data. CountVectorizer keeps
+    the id() of its stop word list, which differs between processes, to
+    cache a consistency check; transform() sets it again as needed.
+    """
+    if engine == "pipeline":
+        model[0].__dict__.pop("_stop_words_id", None)
+
+
+def train(seed: int = 42, test_size: float = 0.2, engine: str = "pipeline"):
+    """Fit a categorizer of the given engine and return it with its held-out accuracy."""
+    df = build_dataset(seed)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["item_text"], df["category"], test_size=test_size, random_state=seed
+    )
+
+    model = make_model(engine)
+    model.fit(X_train, y_train)
+    accuracy = float((model.predict(list(X_test)) == y_test.to_numpy()).mean())
+    return model, accuracy
+
+
+def evaluate(df: pd.DataFrame, engine: str, folds: int, seed: int) -> Dict[str, Any]:
+    """
+    Stratified k-fold evaluation: mean and spread of accuracy, and per-class
+    precision/recall and a confusion matrix over the out-of-fold predictions.
+    """
+    texts = df["item_text"].to_numpy()
+    labels = df["category"].to_numpy()
+    predicted = np.empty(len(df), dtype=object)
+    accuracies = []
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    for train_index, test_index in splitter.split(texts, labels):
+        model = make_model(engine).fit(list(texts[train_index]), labels[train_index])
+        predicted[test_index] = model.predict(list(texts[test_index]))
+        accuracies.append(float((predicted[test_index] == labels[test_index]).mean()))
+
+    classes = sorted(set(labels))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        labels, predicted, labels=classes, zero_division=0
+    )
+    return {
+        "accuracy": float(np.mean(accuracies)),
+        "accuracy_std": float(np.std(accuracies)),
+        "folds": folds,
+        "per_class": {
+            name: {
+                "precision": round(float(p), 4),
+                "recall": round(float(r), 4),
+                "f1": round(float(f), 4),
+                "support": int(n),
+            }
+            for name, p, r, f, n in zip(classes, precision, recall, f1, support)
+        },
+        "labels": classes,
+        "confusion_matrix": confusion_matrix(labels, predicted, labels=classes).tolist(),
+    }
+
+
+def measure_throughput(
+    model, texts: List[str], batch_size: int = THROUGHPUT_BATCH_SIZE, repeat: int = 5
+) -> float:
+    """Items per second through predict_proba, in receipt-sized batches (best of `repeat`)."""
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    model.predict_proba(batches[0])  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for batch in batches:
+            model.predict_proba(batch)
+        best = min(best, time.perf_counter() - started)
+    return len(texts) / best
+
+
+def check_regression(
+    metrics: Dict[str, Any],
+    current: Optional[Dict[str, Any]],
+    current_throughput: Optional[float],
+) -> List[str]:
+    """Reasons the new model should not replace the current one, if any."""
+    problems = []
+    if current_throughput is not None:
+        floor = current_throughput * (1 - MAX_THROUGHPUT_REGRESSION)
+        if metrics["throughput_items_per_sec"] < floor:
+            problems.append(
+                f"throughput {metrics['throughput_items_per_sec']:.0f} items/s is below "
+                f"{floor:.0f} (current model: {current_throughput:.0f} items/s)"
+            )
+    previous = (current or {}).get("metrics", {})
+    # Accuracy is only comparable when it was measured the same way on the same data
+    if previous.get("dataset") == metrics["dataset"] and "accuracy" in previous:
+        floor = previous["accuracy"] - MAX_ACCURACY_REGRESSION
+        if metrics["accuracy"] < floor:
+            problems.append(
+                f"k-fold accuracy {metrics['accuracy']:.4f} is below {floor:.4f} "
+                f"(current model: {previous['accuracy']:.4f})"
+            )
+    return problems
+
+
+def print_report(metrics: Dict[str, Any]) -> None:
+    print(
+        f"k-fold accuracy: {metrics['accuracy']:.4f} "
+        f"(+/- {metrics['accuracy_std']:.4f}, {metrics['folds']} folds, "
+        f"dataset {metrics['dataset']})"
+    )
+    print(f"{'category':<16} {'precision':>9} {'recall':>7} {'f1':>6} {'support':>7}")
+    for name, scores in metrics["per_class"].items():
+        print(
+            f"{name:<16} {scores['precision']:>9.3f} {scores['recall']:>7.3f} "
+            f"{scores['f1']:>6.3f} {scores['support']:>7}"
+        )
+    labels = metrics["labels"]
+    width = max(7, len(str(max(map(max, metrics["confusion_matrix"])))) + 1)
+    print("confusion matrix (rows: true, columns: predicted)")
+    print(" " * 16 + "".join(f"{name[:width - 1]:>{width}}" for name in labels))
+    for name, row in zip(labels, metrics["confusion_matrix"]):
+        print(f"{name:<16}" + "".join(f"{count:>{width}}" for count in row))
+    if "throughput_items_per_sec" in metrics:
+        print(f"throughput: {metrics['throughput_items_per_sec']:.0f} items/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receipt categorizer training")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("--seed", type=int, default=42)
+        sub.add_argument(
+            "--dataset",
+            action="append",
+            help="'synthetic' or 'csv:PATH' (item_text,category); repeat to combine",
+        )
+        sub.add_argument("--folds", type=int, default=5)
+        sub.add_argument(
+            "--engine", choices=model_registry.ENGINES, default=CATEGORIZER_ENGINE
+        )
+        sub.add_argument("--report", help="also write the metrics as JSON here")
 
-# 3. Prepare Data
-data = []
-for category, items in dataset.items():
-    for item in items:
-        data.append((item.lower(), category))
+    train_parser = subparsers.add_parser(
+        "train", help="Train the categorizer and publish it as the current artifact"
+    )
+    add_common(train_parser)
+    train_parser.add_argument("--model-dir", default=MODEL_DIR)
+    train_parser.add_argument(
+        "--allow-regression",
+        action="store_true",
+        help="publish even if slower or less accurate than the current model",
+    )
+    evaluate_parser = subparsers.add_parser(
+        "evaluate", help="Cross-validate and print the report without publishing"
+    )
+    add_common(evaluate_parser)
 
-df = pd.DataFrame(data, columns=["item_text", "category"])
+    args = parser.parse_args(argv)
+    datasets = args.dataset or ["synthetic"]
+    try:
+        df = load_datasets(datasets, args.seed)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    metrics = evaluate(df, args.engine, args.folds, args.seed)
+    metrics["dataset"] = dataset_fingerprint(df)
+    metrics["datasets"] = datasets
+    metrics["items"] = len(df)
 
-# 4. Split
-X_train, X_test, y_train, y_test = train_test_split(
-    df["item_text"], df["category"], test_size=0.2, random_state=42
-)
+    if args.command == "train":
+        texts = list(df["item_text"])
+        model = make_model(args.engine).fit(texts, df["category"])
+        try:
+            current = model_registry.read_manifest(args.model_dir, args.engine)
+            current_model = model_registry.load_artifact(args.model_dir, current)
+        except model_registry.ModelArtifactError:
+            current, current_model = None, None
+        # Alternate the two models so machine noise affects both alike
+        throughput, current_throughput = 0.0, None
+        for _ in range(THROUGHPUT_ROUNDS):
+            throughput = max(throughput, measure_throughput(model, texts))
+            if current_model is not None:
+                current_throughput = max(
+                    current_throughput or 0.0, measure_throughput(current_model, texts)
+                )
+        metrics["throughput_items_per_sec"] = round(throughput)
 
-# 5. Build Pipeline (Vectorizer + Model)
-model = make_pipeline(CountVectorizer(), MultinomialNB())
+    print_report(metrics)
+    if args.report:
+        with open(args.report, "w") as fh:
+            json.dump(metrics, fh, indent=2)
+            fh.write("\n")
+    if args.command == "evaluate":
+        return
 
-# 6. Train
-model.fit(X_train, y_train)
+    problems = check_regression(metrics, current, current_throughput)
+    if problems and not args.allow_regression:
+        for problem in problems:
+            print(f"Not publishing: {problem}")
+        print("Use --allow-regression to publish anyway.")
+        sys.exit(1)
 
-# 7. Save model
-joblib.dump(model, "receipt_categorizer.pkl")
+    drop_process_state(model, args.engine)
+    manifest = model_registry.publish(
+        model,
+        {
+            "seed": args.seed,
+            "sklearn_version": sklearn.__version__,
+            "metrics": metrics,
+        },
+        model_dir=args.model_dir,
+        engine=args.engine,
+    )
+    print(
+        f"Model saved as {manifest['file']} (version {manifest['version']}, "
+        f"{manifest['size_bytes'] / 1024:.0f} KB)"
+    )
 
 if __name__ == "__main__":
-    # Only run when script is executed directly
-    print("Model accuracy on test set:", model.score(X_test, y_test))
-    print("Model saved successfully as receipt_categorizer.pkl")
+    main()
@@ -1,14 +1,11 @@
-import os
 import re
-import joblib
-import requests
 import logging
+from typing import List, Tuple
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.pipeline import make_pipeline
-from sklearn.naive_bayes import MultinomialNB
-from train_model import model as trained_model
-from preprocess import preprocess_line
+import model_registry
+from config import ONLINE_MODEL
+from online_model import online_model
+from line_parser import clean_line_start, strip_price, normalize_item_text  # noqa: F401
 
 # Load environment variables
 load_dotenv()
@@ -26,59 +23,53 @@ if not logger.handlers:
     logger.addHandler(ch)
 
 
-# --- Line Cleaning ---
-def clean_line_start(text: str) -> str:
-    """Remove leading non-alphanumeric characters from a line."""
-    return text.lstrip("=-~*")
-
-
-# --- Strip price and noise from item description ---
-def strip_price(text: str) -> str:
+# --- Local Model Categorization ---
+def categorize_batch(texts: List[str]) -> List[str]:
     """
-    Clean trailing prices, units, and symbols from item descriptions.
-    Example: 'Pepsi 500ml 45.00' -> 'Pepsi'
+    Predict categories for many receipt items with a single model call.
+    Items that are empty after cleaning are returned as "Other".
     """
-    # Remove prices at end
-    text = re.sub(r"[\s:=~-]*[\$₹€]?\s?\d{1,3}(?:[.,]\d{1,7})?\s*$", "", text)
+    return categorize_normalized([normalize_item_text(text) for text in texts])
 
-    # Remove trailing quantity units (e.g., 1L, 3 pcs)
-    text = re.sub(
-        r"\b\d+\s*(kg|g|lbs|oz|ml|l|pcs|pack|packs|tablet|tabs|bottle|box)\b",
-        "",
-        text,
-        flags=re.IGNORECASE,
-    )
 
-    # Remove decorative characters
-    text = re.sub(r"[-=~*]+", "", text)
+def categorize_normalized(cleaned: List[str]) -> List[str]:
+    """categorize_batch for items already passed through normalize_item_text."""
+    return categorize_with_confidence(cleaned)[0]
 
-    # Remove common non-categorization terms
-    text = re.sub(r"(?i)(Tax|Total|Payment Method)", "", text)
 
-    # Remove trailing timestamps (like 15:27)
-    text = re.sub(r"\b\d{1,2}:\d{2}(?:\s*[ap]m)?\b", "", text, flags=re.IGNORECASE)
+def categorize_with_confidence(cleaned: List[str]) -> Tuple[List[str], List[float]]:
+    """
+    Categories for normalized items with the model's probability for each.
+    Items that are empty, or that the model failed on, are "Other" with
+    confidence 0.
+    """
+    categories = ["Other"] * len(cleaned)
+    confidences = [0.0] * len(cleaned)
+    indices = [i for i, item in enumerate(cleaned) if item]
+    if not indices:
+        return categories, confidences
 
-    # Remove street suffixes (common in addresses)
-    text = re.sub(
-        r"\b(st|rd|road|ave|avenue|blvd|street)\b", "", text, flags=re.IGNORECASE
-    )
+    try:
+        texts = [cleaned[i] for i in indices]
+        model = online_model if ONLINE_MODEL else model_registry.get_model()
+        probabilities = model.predict_proba(texts)
+        classes = model.classes_
+    except Exception as e:
+        logger.error(f"Local model prediction failed: {e}")
+        return categories, confidences
 
-    return text.strip()
+    best = probabilities.argmax(axis=1)
+    for i, row, column in zip(indices, probabilities, best):
+        categories[i] = str(classes[column])
+        confidences[i] = float(row[column])
+    return categories, confidences
 
 
-# --- Local Model Categorization ---
 def categorize_text_local(text: str) -> str:
     """
     Predict category using a locally trained ML model.
     """
-    try:
-        cleaned = preprocess_line(strip_price(text).lower())
-        if not cleaned:
-            return "Other"
-        return trained_model.predict([cleaned])[0]
-    except Exception as e:
-        logger.error(f"Local model prediction failed: {e}")
-        return "Other"
+    return categorize_batch([text])[0]
 
 
 # --- Fallback AI Categorization via Ollama ---
@@ -96,49 +87,6 @@ valid_categories = {
 }
 
 
-def call_ollama_model(text: str) -> str:
-    """
-    Fallback categorization using Ollama local model with prompt.
-    """
-    try:
-        prompt = f"""
-        Classify the following receipt item into exactly one of these categories:
-
-        Food, Groceries, Entertainment, Transportation, Shopping, Utilities, Personal Care, Health, Taxes, Other.
-
-        Item: "{text}"
-
-        Respond with only one category name, no explanation.
-        """
-
-        payload = {
-            "model": os.getenv("OLLAMA_MODEL", "llama3"),
-            "prompt": prompt.strip(),
-            "stream": False,
-        }
-
-        response = requests.post("http://localhost:11434/api/generate", json=payload)
-        if response.ok:
-            raw = response.json().get("response", "").strip()
-            logger.info(f"Ollama raw response for '{text}': '{raw}'")
-
-            # Validate and normalize category
-            category = raw.title()
-            if category in valid_categories:
-                return category
-            else:
-                logger.warning(
-                    f"Ollama returned invalid category: '{raw}' (normalized: '{category}')"
-                )
-        else:
-            logger.error(f"Ollama API error {response.status_code}: {response.text}")
-
-    except Exception as e:
-        logger.error(f"Exception calling Ollama for '{text}': {e}")
-
-    return "Other"
-
-
 # --- Budget Helper Functions ---
 def calculate_budget_usage(spent, budget):
     """Calculate what percentage of budget has been used"""
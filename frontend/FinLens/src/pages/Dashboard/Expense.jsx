@@ -145,6 +145,7 @@ const Expense = () => {
               amount,
               date: new Date().toISOString().split('T')[0], // Today's date
               icon: '', // Default icon or category-based icon
+              merchant: scanResults.merchant,
             });
             addedCount++;
           }